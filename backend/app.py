@@ -1,92 +1,414 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import atexit
 import json
 import os
+import time
 from datetime import datetime
-from threading import Thread
-from scraper import UniversalEcommerceScraper
+from cache import ResultCache, make_key
+from storage import PriceStore, product_key
+from matching import group_products
+from jobs import JobManager, QueueFullError, PRIORITY_REFRESH
+from jobqueue import JobQueue, QueuedJobManager
+from health import merge_snapshots
+from metrics import REGISTRY, Gauge
+from product import Product, to_json
+from export import ExportError, OBSERVATION_FIELDS, PRODUCT_FIELDS, stream_export
+from selector_stats import SelectorStats
+from watchlist import WatchScheduler
+from search_index import ProductIndex
+from result_set import ResultSet, SORTS
+from sites import SITES
+
+class ProductJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(o):
+        if isinstance(o, Product):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
 
 app = Flask(__name__, static_folder='../frontend/build', static_url_path='')
+app.json = ProductJSONProvider(app)
 CORS(app)
 
-scraping_status = {
-    'is_running': False,
-    'progress': 0,
-    'message': 'Ready',
-    'last_search': None
-}
+# thread: scrape in this process; process: hand jobs to `python worker.py` through the shared job queue
+SCRAPE_MODE = os.environ.get('SCRAPE_MODE', 'thread')
+
+result_cache = ResultCache(max_bytes=int(os.environ.get('RESULT_CACHE_MB', 64)) * 1024 * 1024)
+
+price_store = PriceStore(os.environ.get('PRICE_DB', 'data/prices.db'))
+
+selector_stats = SelectorStats(os.environ.get('SELECTOR_STATS', 'data/selector_stats.json'))
+
+product_index = ProductIndex(os.environ.get('PRODUCT_INDEX', 'data/product_index.json'),
+                             max_products=int(os.environ.get('INDEX_MAX_PRODUCTS', 20000)))
+if not len(product_index):
+    # First start: index what earlier runs already stored
+    product_index.seed(price_store.latest_products(product_index.max_products))
+atexit.register(product_index.save)
+
+def remember_results(job):
+    """Warm this process's cache and index with results a worker process just scraped"""
+    result_cache.set(job.cache_key, job.results, job.site_status, source=job.id)
+    product_index.add(job.results)
+
+if SCRAPE_MODE == 'process':
+    jobs = QueuedJobManager(
+        JobQueue(os.environ.get('JOB_DB', 'data/jobs.db')),
+        max_queue=int(os.environ.get('SCRAPE_QUEUE_SIZE', 20)),
+        on_finish=remember_results
+    )
+    # Workers that have not reported for this long are gone; their breakers no longer apply
+    worker_max_age = int(os.environ.get('WORKER_STALE_AFTER', 120))
+    
+    def site_health():
+        return merge_snapshots(stats['site_health'] for stats in jobs.queue.worker_stats(worker_max_age).values())
+    
+    def driver_pool_stats():
+        totals = {}
+        for stats in jobs.queue.worker_stats(worker_max_age).values():
+            for state, n in stats['driver_pool'].items():
+                totals[state] = totals.get(state, 0) + n
+        return totals
+    
+    def worker_metrics():
+        return [stats['metrics'] for stats in jobs.queue.worker_stats().values()]
+else:
+    from runner import ScrapeRunner
+    
+    price_store.start_maintenance(retention_days=int(os.environ.get('PRICE_RETENTION_DAYS', 90)))
+    atexit.register(selector_stats.save)
+    runner = ScrapeRunner(price_store, selector_stats)
+    
+    def run_job(job):
+        products = runner.run_job(job)
+        result_cache.set(job.cache_key, products, job.site_status)
+        product_index.add(products)
+        return products
+    
+    jobs = JobManager(
+        run_job,
+        workers=int(os.environ.get('SCRAPE_WORKERS', 2)),
+        max_queue=int(os.environ.get('SCRAPE_QUEUE_SIZE', 20))
+    )
+    
+    def site_health():
+        return runner.health.snapshot()
+    
+    def driver_pool_stats():
+        return runner.driver_pool.stats()
+    
+    def worker_metrics():
+        # Scrape metrics are recorded in this process already
+        return []
+
+REGISTRY.register(Gauge('shopsmart_site_circuit_open', 'Retailers currently skipped by their circuit breaker',
+                        ('site',), read=lambda: {site: int(status['state'] != 'closed')
+                                                 for site, status in site_health().items()}))
+REGISTRY.register(Gauge('shopsmart_driver_pool', 'Browser pool drivers by state', ('state',),
+                        read=lambda: {k: v for k, v in driver_pool_stats().items()
+                                      if k in ('idle', 'leased', 'total')}))
 
-latest_results = []
+watch_scheduler = WatchScheduler(
+    price_store,
+    jobs,
+    make_key,
+    # Leave the remaining workers free for interactive searches
+    capacity=max(1, int(os.environ.get('SCRAPE_WORKERS', 2)) - 1),
+    default_interval=int(os.environ.get('WATCH_INTERVAL', 900)),
+    popular_threshold=int(os.environ.get('WATCH_POPULAR_AFTER', 3))
+)
+if SCRAPE_MODE != 'process':
+    # In process mode the worker supervisor schedules watches
+    watch_scheduler.start()
+
+REGISTRY.register(Gauge('shopsmart_queue_depth', 'Scrape jobs waiting for a worker', read=jobs.queue_depth))
+REGISTRY.register(Gauge('shopsmart_jobs', 'Retained jobs by state', ('state',), read=lambda: jobs.stats()['jobs']))
+REGISTRY.register(Gauge('shopsmart_cache_bytes', 'Estimated size of cached results',
+                        read=lambda: result_cache.stats()['bytes']))
+
+def latest_results():
+    job = jobs.latest(finished=True)
+    return (job.results or []) if job else []
 
 @app.route('/api/search', methods=['POST'])
 def search_products():
     data = request.json
     search_query = data.get('query', '')
     websites = data.get('websites', None)
+    deep = bool(data.get('deep', False))
     
     if not search_query:
         return jsonify({'error': 'Search query is required'}), 400
     
-    def scrape_background():
-        global scraping_status, latest_results
-        scraping_status = {
-            'is_running': True,
-            'progress': 10,
-            'message': 'Initializing scraper...',
-            'last_search': search_query
-        }
-        
-        try:
-            scraper = UniversalEcommerceScraper(debug_mode=False)
-            scraping_status['progress'] = 30
-            scraping_status['message'] = 'Scraping products...'
-            
-            products = scraper.compare_prices(search_query, websites)
-            
-            scraping_status['progress'] = 90
-            scraping_status['message'] = 'Processing results...'
-            latest_results = products
-            
-            scraping_status['progress'] = 100
-            scraping_status['message'] = f'Found {len(products)} products'
-            scraping_status['is_running'] = False
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'results_{timestamp}.json'
-            with open(f'data/{filename}', 'w', encoding='utf-8') as f:
-                json.dump(products, f, indent=2, ensure_ascii=False)
-                
-        except Exception as e:
-            scraping_status['is_running'] = False
-            scraping_status['message'] = f'Error: {str(e)}'
-            print(f"Scraping error: {e}")
-    
-    thread = Thread(target=scrape_background)
-    thread.daemon = True
-    thread.start()
-    
-    return jsonify({'status': 'started', 'message': 'Scraping initiated'})
+    if not deep:
+        watch_scheduler.note_search(search_query, websites)
+    product_index.note_query(search_query)
+    
+    cache_key = result_cache.make_key(search_query, websites, deep)
+    cached = result_cache.get(cache_key)
+    if cached:
+        products, is_stale, source = cached
+        job = jobs.add_completed(search_query, websites, cache_key, products, source)
+        # Stale-while-revalidate: answer now, refresh behind the response at low priority
+        if is_stale:
+            try:
+                jobs.submit(search_query, websites, cache_key, priority=PRIORITY_REFRESH, deep=deep)
+            except QueueFullError:
+                pass
+        return jsonify({'status': 'cached', 'job_id': job.id, 'message': 'Served from cache', 'stale': is_stale})
+    
+    # Identical searches already running share that job instead of launching another
+    try:
+        job, created = jobs.submit(search_query, websites, cache_key, deep=deep)
+    except QueueFullError:
+        response = jsonify({'error': 'Too many searches in progress, please retry shortly'})
+        response.headers['Retry-After'] = '10'
+        return response, 429
+    
+    if not created:
+        return jsonify({'status': 'joined', 'job_id': job.id, 'message': 'Joined in-progress search'})
+    return jsonify({'status': 'started', 'job_id': job.id, 'message': 'Scraping initiated'})
+
+@app.route('/api/instant', methods=['GET'])
+def instant_search():
+    """Answer from previously scraped products; refresh=1 also starts a live search to stream"""
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    started = time.perf_counter()
+    results = product_index.search(query, limit)
+    response = {'query': query, 'results': results, 'count': len(results),
+                'took_ms': round((time.perf_counter() - started) * 1000, 2)}
+    
+    if request.args.get('refresh') and query.strip():
+        cache_key = result_cache.make_key(query)
+        cached = result_cache.get(cache_key)
+        if not cached or cached[1]:
+            try:
+                job, _ = jobs.submit(query, None, cache_key)
+                response['job_id'] = job.id
+            except QueueFullError:
+                pass
+    return jsonify(response)
+
+@app.route('/api/suggest', methods=['GET'])
+def suggest_queries():
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 8, type=int), 50)
+    return jsonify({'query': query, 'suggestions': product_index.suggest(query, limit)})
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    return jsonify(scraping_status)
+    job = jobs.latest()
+    if not job:
+        return jsonify({'is_running': False, 'progress': 0, 'message': 'Ready', 'last_search': None})
+    return jsonify(job.to_status())
+
+@app.route('/api/status/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_status())
+
+@app.route('/api/stream/<job_id>', methods=['GET'])
+def stream_job(job_id):
+    """Server-sent events: progress, per-site products as they land, then done or error"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown job'}), 404
+    
+    # Resume after the last event the client saw; a missing or garbled id replays from the start
+    try:
+        cursor = max(0, int(request.headers.get('Last-Event-ID', -1)) + 1)
+    except ValueError:
+        cursor = 0
+    
+    def generate():
+        position = cursor
+        while True:
+            events = job.events_since(position)
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for event, data in events:
+                yield f"id: {position}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=to_json)}\n\n"
+                position += 1
+                if event in ('done', 'error'):
+                    return
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+PAGE_PARAMS = ('source', 'category', 'min_price', 'max_price', 'min_rating', 'sort', 'cursor', 'limit')
+
+def results_page(job):
+    """Filtered, sorted page of a finished job's results, served from indexes built once per job"""
+    sort = request.args.get('sort', 'price_low')
+    if sort not in SORTS:
+        return jsonify({'error': f"sort must be one of {', '.join(SORTS)}"}), 400
+    cursor = request.args.get('cursor', '0')
+    if not cursor.isdigit():
+        return jsonify({'error': 'Invalid cursor'}), 400
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    # Sources may be given as site keys (amazon) or display names (Amazon)
+    sources = [SITES[s].name if s in SITES else s for s in request.args.get('source', '').split(',') if s]
+    categories = [c for c in request.args.get('category', '').split(',') if c]
+
+    if job.view is None:
+        job.view = ResultSet(job.results or [])
+    products, next_cursor = job.view.page(
+        sort=sort, cursor=int(cursor), limit=limit, sources=sources, categories=categories,
+        min_price=request.args.get('min_price', type=float),
+        max_price=request.args.get('max_price', type=float),
+        min_rating=request.args.get('min_rating', type=float)
+    )
+    page = {
+        'job_id': job.id,
+        'results': products,
+        'next_cursor': str(next_cursor) if next_cursor is not None else None,
+        'total': len(job.view.products)
+    }
+    if cursor == '0':
+        page['facets'] = job.view.facets()
+    return jsonify(page)
 
 @app.route('/api/results', methods=['GET'])
 def get_results():
-    return jsonify(latest_results)
+    if any(param in request.args for param in PAGE_PARAMS):
+        job = jobs.latest(finished=True)
+        if not job:
+            return jsonify({'error': 'No results available'}), 404
+        return results_page(job)
+    return jsonify(latest_results())
+
+@app.route('/api/results/<job_id>', methods=['GET'])
+def get_job_results(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown job'}), 404
+    if not job.is_finished:
+        return jsonify({'error': 'Job not finished', 'state': job.state}), 202
+    if request.args.get('grouped'):
+        # Cross-retailer clusters, computed once per job
+        if job.groups is None:
+            job.groups = group_products(job.results or [])
+        return jsonify(job.groups)
+    if any(param in request.args for param in PAGE_PARAMS):
+        return results_page(job)
+    return jsonify(job.results or [])
+
+@app.route('/api/history', methods=['GET'])
+def get_price_history():
+    source = request.args.get('source', '')
+    url = request.args.get('url', '')
+    if not source or not (request.args.get('key') or url):
+        return jsonify({'error': 'source and key (or url) are required'}), 400
+    key = request.args.get('key') or product_key({'url': url, 'title': ''})
+    
+    days = request.args.get('days', type=float)
+    since = time.time() - days * 86400 if days else None
+    return jsonify({
+        'source': source,
+        'key': key,
+        'history': price_store.price_history(source, key, since),
+        'cheapest': price_store.cheapest_ever(source, key)
+    })
+
+@app.route('/api/price-drops', methods=['GET'])
+def get_price_drops():
+    hours = request.args.get('hours', 24, type=float)
+    min_pct = request.args.get('min_pct', 0, type=float)
+    limit = min(request.args.get('limit', 100, type=int), 500)
+    return jsonify(price_store.price_drops(time.time() - hours * 3600, min_pct, limit))
+
+@app.route('/api/watchlist', methods=['GET'])
+def get_watchlist():
+    return jsonify(price_store.watches())
+
+@app.route('/api/watchlist', methods=['POST'])
+def add_watch():
+    data = request.json or {}
+    query = (data.get('query') or '').strip()
+    if not query:
+        return jsonify({'error': 'Search query is required'}), 400
+    interval = data.get('interval')
+    if interval is not None and (not isinstance(interval, (int, float)) or interval < 60):
+        return jsonify({'error': 'interval must be at least 60 seconds'}), 400
+    
+    watch_id = watch_scheduler.add(query, data.get('websites'), interval)
+    return jsonify({'id': watch_id, 'message': 'Query added to watchlist'}), 201
+
+@app.route('/api/watchlist/<int:watch_id>', methods=['DELETE'])
+def remove_watch(watch_id):
+    if not price_store.remove_watch(watch_id):
+        return jsonify({'error': 'Unknown watch'}), 404
+    return jsonify({'message': 'Watch removed'})
+
+@app.route('/api/watchlist/changes', methods=['GET'])
+def get_watch_changes():
+    hours = request.args.get('hours', 24, type=float)
+    watch_id = request.args.get('watch_id', type=int)
+    limit = min(request.args.get('limit', 200, type=int), 1000)
+    return jsonify(price_store.watch_changes(time.time() - hours * 3600, watch_id, limit))
+
+@app.route('/api/runs', methods=['GET'])
+def get_runs():
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify(price_store.runs(request.args.get('query'), limit))
 
 @app.route('/api/export', methods=['GET'])
 def export_results():
-    if not latest_results:
-        return jsonify({'error': 'No results available'}), 404
+    """Stream results as NDJSON, CSV or Parquet (optionally gzipped).
+
+    job_id exports that job; run_id, query or days export stored price observations;
+    otherwise the latest search is exported.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    run_id = request.args.get('run_id', type=int)
+    history_query = request.args.get('query')
+    days = request.args.get('days', type=float)
     
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'export_{timestamp}.json'
+    if request.args.get('job_id'):
+        job = jobs.get(request.args['job_id'])
+        if not job:
+            return jsonify({'error': 'Unknown job'}), 404
+        if not job.is_finished:
+            return jsonify({'error': 'Job not finished', 'state': job.state}), 202
+        rows, fields = job.results or [], PRODUCT_FIELDS
+    elif run_id is not None or history_query or days:
+        since = time.time() - days * 86400 if days else None
+        rows, fields = price_store.iter_observations(run_id, history_query, since), OBSERVATION_FIELDS
+    else:
+        rows, fields = latest_results(), PRODUCT_FIELDS
+        if not rows:
+            return jsonify({'error': 'No results available'}), 404
     
-    with open(f'exports/{filename}', 'w', encoding='utf-8') as f:
-        json.dump(latest_results, f, indent=2, ensure_ascii=False)
+    try:
+        chunks, mimetype, extension = stream_export(rows, fmt, fields, gzip=bool(request.args.get('gzip')))
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({'filename': filename, 'count': len(latest_results)})
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="export_{timestamp}.{extension}"'})
+
+@app.route('/api/selector-stats', methods=['GET'])
+def get_selector_stats():
+    if SCRAPE_MODE == 'process':
+        # Workers own the counts; pick up what they last saved
+        selector_stats.load()
+    return jsonify(selector_stats.snapshot())
+
+@app.route('/api/site-health', methods=['GET'])
+def get_site_health():
+    # In process mode: each worker keeps its own breakers, merged here from their latest reports
+    return jsonify(site_health())
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(REGISTRY.render(worker_metrics()), mimetype='text/plain; version=0.0.4')
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -98,5 +420,6 @@ def serve(path):
 
 if __name__ == '__main__':
     os.makedirs('data', exist_ok=True)
-    os.makedirs('exports', exist_ok=True)
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # No reloader: its watcher process imports this module too, and would warm a second browser
+    # pool and run its own jobs and watch scheduler; each reload would also orphan the old browsers
+    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5000)
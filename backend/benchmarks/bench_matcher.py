@@ -0,0 +1,102 @@
+"""Micro-benchmark of relevance filtering and categorization per title.
+
+Compares the original per-call implementation (keyword lists and regexes rebuilt
+on every call) with the compiled QueryMatcher and category patterns.
+
+Run from backend/:  python benchmarks/bench_matcher.py [titles.txt] [--query "iphone 15"]
+A titles file holds one product title per line; without one a synthetic corpus is used.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import QueryMatcher, categorize
+
+
+def legacy_is_relevant(title, query):
+    if not title or len(title) < 3:
+        return False
+    title_lower = title.lower()
+    query_lower = query.lower()
+    accessory_keywords = ['cover', 'case', 'protector', 'charger', 'cable', 'adapter',
+                          'earphone', 'headphone', 'stand', 'holder', 'skin', 'bumper']
+    if any(acc in title_lower for acc in accessory_keywords):
+        return False
+    if 'iphone' in query_lower:
+        query_model = re.search(r'iphone\s*(\d+)', query_lower)
+        title_model = re.search(r'iphone\s*(\d+)', title_lower)
+        if query_model and title_model:
+            return query_model.group(1) == title_model.group(1)
+    query_words = [w for w in query_lower.split() if len(w) > 2]
+    if not query_words:
+        return False
+    match_count = sum(1 for word in query_words if word in title_lower)
+    return match_count >= len(query_words) / 2
+
+
+def legacy_categorize(title):
+    title_lower = title.lower()
+    categories = {
+        'Mobile Phones': ['phone', 'mobile', 'iphone', 'samsung', 'oneplus', 'pixel'],
+        'Laptops': ['laptop', 'notebook', 'macbook', 'chromebook'],
+        'Television': ['tv', 'television', 'smart tv'],
+        'Groceries': ['rice', 'wheat', 'oil', 'dal', 'sugar', 'tea', 'coffee'],
+        'Home Appliances': ['mixer', 'grinder', 'cooker', 'refrigerator', 'washing machine']
+    }
+    for category, keywords in categories.items():
+        if any(kw in title_lower for kw in keywords):
+            return category
+    return "General Products"
+
+
+def synthetic_titles(count, seed=11):
+    rng = random.Random(seed)
+    words = ['Apple', 'iPhone', '13', '14', '15', 'Pro', 'Max', 'Samsung', 'Galaxy', 'S23', 'Silicone',
+             'Case', 'for', 'Black', '128', 'GB', 'Laptop', 'Intel', 'Core', 'i5', 'Basmati', 'Rice', '5kg',
+             'Smart', 'TV', '55', 'inch', 'Mixer', 'Grinder', '750W', 'Tempered', 'Glass', 'Protector',
+             'Fast', 'Charger', 'USB-C', 'Blue', 'Titanium', 'Edition', 'Green', 'Tea', 'Premium']
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(4, 14))) for _ in range(count)]
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed * 1000:>9.1f} ms  {elapsed / count * 1e6:>7.2f} us/title")
+    return result
+
+
+def run(titles, query):
+    count = len(titles)
+    print(f"{count} titles, query {query!r}")
+
+    print("relevance")
+    expected = timed('legacy per title', count, lambda: [legacy_is_relevant(t, query) for t in titles])
+    matcher = QueryMatcher(query)
+    compiled = timed('compiled', count, lambda: [matcher.is_relevant(t) for t in titles])
+    assert expected == compiled, 'relevance results differ from legacy implementation'
+
+    print("categorization")
+    expected = timed('legacy per title', count, lambda: [legacy_categorize(t) for t in titles])
+    compiled = timed('compiled', count, lambda: [categorize(t) for t in titles])
+    assert expected == compiled, 'categories differ from legacy implementation'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('titles', nargs='?', help='file with one title per line')
+    parser.add_argument('--query', default='iphone 15 pro')
+    parser.add_argument('--count', type=int, default=200000)
+    args = parser.parse_args()
+
+    if args.titles:
+        with open(args.titles, encoding='utf-8') as f:
+            corpus = [line.strip() for line in f if line.strip()]
+    else:
+        corpus = synthetic_titles(args.count)
+    run(corpus, args.query)
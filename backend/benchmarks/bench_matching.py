@@ -0,0 +1,96 @@
+"""Benchmark cross-retailer matching over synthetic listing sets.
+
+Run from backend/:  python benchmarks/bench_matching.py [sizes...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matching import build_blocks, group_products
+
+SOURCES = ['Flipkart', 'Amazon', 'Vijay Sales', 'JioMart', 'Croma']
+LINES = [('Apple', 'iPhone', ['13', '14', '15', '16']), ('Samsung', 'Galaxy', ['S23', 'S24', 'A54', 'M14']),
+         ('OnePlus', 'Nord', ['CE3', 'CE4', '3']), ('Google', 'Pixel', ['7a', '8', '8a']),
+         ('Xiaomi', 'Redmi Note', ['12', '13', '13 Pro'])]
+SUFFIXES = ['', ' Pro', ' Plus', ' Ultra']
+COLORS = ['Black', 'Blue', 'Green', 'Midnight', 'Silver']
+STORAGE = [64, 128, 256, 512]
+TEMPLATES = [
+    '{brand} {line} {model} ({storage} GB) - {color}',
+    '{brand} {line} {model} ({color}, {storage} GB)',
+    '{line} {model} 5G {storage}GB {color}',
+    '{brand_upper} {line} {model} ({color}, 8GB RAM, {storage}GB Storage)'
+]
+
+
+# Listings of one product as different retailers title it; each set must form a single cluster
+EQUIVALENT = [
+    ['OnePlus Nord CE3 5G (Aqua Surge, 128 GB)', 'Nord CE3 5G 128GB', 'ONEPLUS Nord CE3 (8GB RAM, 128GB Storage)'],
+    ['Xiaomi Redmi Note 12 (64 GB) - Blue', 'Redmi Note 12 5G 64GB Blue', 'REDMI Note 12 (Blue, 4GB RAM, 64GB Storage)'],
+    ['Apple iPhone 15 (128 GB) - Black', 'iPhone 15 5G 128GB Black', 'APPLE iPhone 15 (Black, 128 GB)'],
+    ['POCO X5 Pro 5G (Yellow, 256 GB)', 'Xiaomi Poco X5 Pro 256GB'],
+    ['Samsung 108 cm (43 inches) Crystal 4K Smart TV', 'SAMSUNG Crystal 4K 43 inch Smart TV'],
+    ['Samsung Galaxy M14 5G (6000 mAh, 128 GB)', 'Samsung Galaxy M14 5G 128GB 6.6 inch 6000mAh',
+     'Samsung Galaxy M14 128 GB'],
+]
+# Titles of different products (sizes, packs) that must not share a cluster
+DISTINCT = [
+    ['Samsung 108 cm (43 inches) Crystal 4K Smart TV', 'Samsung 139 cm (55 inches) Crystal 4K Smart TV'],
+    ['Samsung Galaxy Watch 6 40mm Graphite', 'Samsung Galaxy Watch 6 (44mm, Graphite)'],
+    ['Aashirvaad Atta 5 kg', 'Aashirvaad Atta 10 kg'],
+]
+
+
+def check_equivalents():
+    for titles in EQUIVALENT:
+        listings = [{'title': title, 'price_num': 10000 + i, 'source': SOURCES[i], 'url': f'https://example.com/e/{i}'}
+                    for i, title in enumerate(titles)]
+        clusters = group_products(listings)
+        assert len(clusters) == 1, f"{titles} split into {[c['cluster_id'] for c in clusters]}"
+    print(f"{len(EQUIVALENT)} equivalent title sets each form one cluster")
+
+    for titles in DISTINCT:
+        listings = [{'title': title, 'price_num': 10000 + i, 'source': SOURCES[i], 'url': f'https://example.com/d/{i}'}
+                    for i, title in enumerate(titles)]
+        clusters = group_products(listings)
+        assert len(clusters) == len(titles), f"{titles} merged into {[c['cluster_id'] for c in clusters]}"
+    print(f"{len(DISTINCT)} sets of different products stay apart")
+
+
+def synthetic_listings(count, seed=7):
+    rng = random.Random(seed)
+    listings = []
+    for _ in range(count):
+        brand, line, models = rng.choice(LINES)
+        title = rng.choice(TEMPLATES).format(
+            brand=brand, brand_upper=brand.upper(), line=line,
+            model=rng.choice(models) + rng.choice(SUFFIXES),
+            storage=rng.choice(STORAGE), color=rng.choice(COLORS))
+        listings.append({
+            'title': title,
+            'price_num': rng.randint(8000, 150000),
+            'source': rng.choice(SOURCES),
+            'url': f'https://example.com/p/{len(listings)}'
+        })
+    return listings
+
+
+def run(sizes):
+    check_equivalents()
+    print(f"{'listings':>10} {'clusters':>9} {'ms':>9} {'listings/s':>11} {'block pairs':>12} {'naive pairs':>13}")
+    for size in sizes:
+        listings = synthetic_listings(size)
+        started = time.perf_counter()
+        clusters = group_products(listings)
+        elapsed = time.perf_counter() - started
+        blocked_pairs = sum(len(m) * (len(m) - 1) // 2 for m in build_blocks(listings).values())
+        naive_pairs = size * (size - 1) // 2
+        print(f"{size:>10} {len(clusters):>9} {elapsed * 1000:>9.1f} {size / elapsed:>11.0f} "
+              f"{blocked_pairs:>12} {naive_pairs:>13}")
+
+
+if __name__ == '__main__':
+    run([int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000, 20000])
@@ -0,0 +1,150 @@
+"""End-to-end scraper benchmark against recorded search pages.
+
+Record fixtures once from the live sites (needs Chrome and network):
+    python benchmarks/bench_scraper.py --record --query "iphone 15"
+Replay them offline through the lxml parser, a headless browser, or both:
+    python benchmarks/bench_scraper.py --mode parser --query "iphone 15"
+    python benchmarks/bench_scraper.py --mode browser --query "iphone 15" --repeat 3
+
+Run from backend/. Reports per-site time-to-ready, extraction time, WebDriver
+command counts and products/second for scrape_<site> and compare_prices.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driver_pool import DriverPool
+from replay import FIXTURE_DIR, FixtureServer, ReplayDriver, ReplayFetcher, record
+from scraper import UniversalEcommerceScraper, launch_driver
+from sites import SITES
+
+ROW = "  {:<24} {:>9} {:>9} {:>9} {:>7} {:>9} {:>10}"
+
+
+def print_header(title):
+    print(title)
+    print(ROW.format('run', 'total ms', 'ready ms', 'extract', 'calls', 'products', 'products/s'))
+
+
+def print_row(label, elapsed, ready, extract, calls, products):
+    ms = lambda seconds: '-' if seconds is None else f'{seconds * 1000:.1f}'
+    rate = f'{products / elapsed:.1f}' if elapsed else '-'
+    print(ROW.format(label, ms(elapsed), ms(ready), ms(extract), calls, products, rate))
+
+
+def timed_extraction(scraper):
+    """Wrap the scraper's extractor so its wall time is collected per call"""
+    samples = []
+    extract_batch = scraper.extract_batch
+
+    def timed(site, plan=None, offset=0):
+        started = time.perf_counter()
+        try:
+            return extract_batch(site, plan, offset)
+        finally:
+            samples.append(time.perf_counter() - started)
+
+    scraper.extract_batch = timed
+    return samples
+
+
+def sites_for(fixtures, query):
+    urls = {SITES[key].search_url(query): key for key in SITES}
+    return [urls[url] for url in fixtures if url in urls]
+
+
+def bench_parser(fixture_dir, queries, repeat):
+    fetcher = ReplayFetcher(fixture_dir)
+    scraper = UniversalEcommerceScraper(fetcher=fetcher)
+    print_header("parser replay (lxml)")
+    for query in queries:
+        for site_key in sites_for(fetcher.fixtures, query):
+            site = SITES[site_key]
+            url = site.search_url(query)
+            fetcher.page_for(url)
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = fetcher.fetch_rows(site_key, url) or []
+                extracted = time.perf_counter()
+                products = scraper.build_products(site, rows, url, query)
+                print_row(f'{site_key} [{query}]', time.perf_counter() - started, None,
+                          extracted - started, 0, len(products))
+
+
+def bench_browser(fixture_dir, queries, repeat):
+    server = FixtureServer(fixture_dir).start()
+    calls = Counter()
+    driver = ReplayDriver(launch_driver(), server.routes(), calls)
+    scraper = UniversalEcommerceScraper()
+    scraper.driver = driver
+    samples = timed_extraction(scraper)
+    try:
+        print_header("browser replay, scrape_<site>")
+        for query in queries:
+            for site_key in sites_for(server.fixtures, query):
+                for _ in range(repeat):
+                    calls.clear()
+                    samples.clear()
+                    started = time.perf_counter()
+                    products = list(getattr(scraper, f'scrape_{site_key}')(query))
+                    print_row(f'{site_key} [{query}]', time.perf_counter() - started,
+                              scraper.ready_times.get(SITES[site_key].name), sum(samples),
+                              sum(calls.values()), len(products))
+    finally:
+        driver.quit()
+
+    pool = DriverPool(lambda: ReplayDriver(launch_driver(), server.routes(), calls), size=2)
+    pool.start()
+    try:
+        print_header("browser replay, compare_prices (parallel, 2 browsers)")
+        for query in queries:
+            websites = sites_for(server.fixtures, query)
+            for _ in range(repeat):
+                calls.clear()
+                scraper = UniversalEcommerceScraper(driver_pool=pool, parallel=True)
+                started = time.perf_counter()
+                products = scraper.compare_prices(query, websites)
+                ready = max(scraper.ready_times.values(), default=None)
+                print_row(f'compare_prices [{query}]', time.perf_counter() - started, ready, None,
+                          sum(calls.values()), len(products))
+    finally:
+        pool.shutdown()
+        server.stop()
+
+
+def record_fixtures(fixture_dir, queries, websites):
+    scraper = UniversalEcommerceScraper()
+    scraper.create_driver()
+    try:
+        for query in queries:
+            for site_key in websites:
+                try:
+                    print(f"  📼 {site_key} [{query}] -> {record(scraper, site_key, query, fixture_dir)}")
+                except Exception as e:
+                    print(f"  ❌ Could not record {site_key} [{query}]: {e}")
+    finally:
+        scraper.driver.quit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--query', action='append', help='search query (repeatable)')
+    parser.add_argument('--fixtures', default=FIXTURE_DIR)
+    parser.add_argument('--mode', choices=['parser', 'browser', 'both'], default='parser')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--record', action='store_true', help='snapshot live pages instead of replaying')
+    parser.add_argument('--sites', nargs='*', default=list(SITES))
+    args = parser.parse_args()
+    queries = args.query or ['iphone 15']
+
+    if args.record:
+        record_fixtures(args.fixtures, queries, args.sites)
+    else:
+        if args.mode in ('parser', 'both'):
+            bench_parser(args.fixtures, queries, args.repeat)
+        if args.mode in ('browser', 'both'):
+            bench_browser(args.fixtures, queries, args.repeat)
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+from health import FAILURES
+from sites import SITES
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+
+def make_key(query, websites=None, deep=False):
+    sites = sorted(set(websites)) if websites else sorted(SITES)
+    return normalize_query(query), tuple(sites), bool(deep)
+
+
+def estimate_size(products):
+    """Rough byte size of a product list, cheap enough to run on every insert"""
+    return sum(product.size() for product in products)
+
+
+class CacheEntry:
+    def __init__(self, products, ttl, stale_ttl, source=None):
+        now = time.time()
+        self.products = products
+        # Id of the job the products came from, when it is stored somewhere other processes can read
+        self.source = source
+        self.size = estimate_size(products)
+        self.fresh_until = now + ttl
+        self.stale_until = now + ttl + stale_ttl
+
+
+class ResultCache:
+    """LRU cache of search results with per-site TTLs and stale-while-revalidate"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, stale_ttl=3600, partial_ttl=60):
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        # Fresh and stale lifetime of a result set some sites failed or were skipped for
+        self.partial_ttl = partial_ttl
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, query, websites=None, deep=False):
+        return make_key(query, websites, deep)
+
+    def ttl_for(self, key):
+        # A result set is only as fresh as its most volatile site
+        return min((SITES[site].cache_ttl for site in key[1] if site in SITES), default=600)
+
+    def get(self, key):
+        """Return (products, is_stale, source job id), or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now > entry.stale_until:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.products, now > entry.fresh_until, entry.source
+
+    def set(self, key, products, site_status=None, source=None):
+        # An empty result set is more likely an outage than a real answer: do not serve it again
+        if not products:
+            return
+        if any(status in FAILURES or status == 'skipped' for status in (site_status or {}).values()):
+            entry = CacheEntry(products, min(self.ttl_for(key), self.partial_ttl), self.partial_ttl, source)
+        else:
+            entry = CacheEntry(products, self.ttl_for(key), self.stale_ttl, source)
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+            while self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    """Bounded pool of warm browser drivers that are leased to searches and recycled"""
+
+    def __init__(self, factory, size=2, max_uses=20, max_memory_mb=1500,
+                 lease_timeout=120, reset_origins=None):
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.lease_timeout = lease_timeout
+        self.reset_origins = list(reset_origins or [])
+
+        self._idle = []
+        self._leased = {}
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.recycled = 0
+
+    def start(self):
+        """Pre-warm browsers up to the pool size"""
+        while True:
+            with self._cond:
+                if self._closed or self._total >= self.size:
+                    return
+                self._total += 1
+            try:
+                pooled = self._spawn()
+            except Exception as e:
+                print(f"  ❌ Could not pre-warm browser: {e}")
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                return
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def start_background(self):
+        thread = threading.Thread(target=self.start, daemon=True)
+        thread.start()
+        return thread
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Lease a healthy driver; it is recycled if the block raises"""
+        pooled = self._acquire(self.lease_timeout if timeout is None else timeout)
+        try:
+            yield pooled.driver
+        except BaseException:
+            self._destroy(pooled)
+            raise
+        else:
+            self._release(pooled)
+
+    def discard(self, driver):
+        """Mark a leased driver as broken so it is destroyed instead of reused"""
+        with self._cond:
+            pooled = self._leased.get(id(driver))
+        if pooled:
+            pooled.uses = self.max_uses
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._quit(pooled)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'total': self._total,
+                'idle': len(self._idle),
+                'leased': len(self._leased),
+                'recycled': self.recycled
+            }
+
+    def _acquire(self, timeout):
+        deadline = time.time() + timeout
+        while True:
+            spawn = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError('Driver pool is shut down')
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._total < self.size:
+                        self._total += 1
+                        spawn = True
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError(f'No browser available within {timeout}s')
+                    self._cond.wait(remaining)
+
+            if spawn:
+                try:
+                    pooled = self._spawn()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(pooled):
+                self._destroy(pooled)
+                continue
+
+            pooled.uses += 1
+            with self._cond:
+                self._leased[id(pooled.driver)] = pooled
+            return pooled
+
+    def _release(self, pooled):
+        with self._cond:
+            self._leased.pop(id(pooled.driver), None)
+
+        if pooled.uses >= self.max_uses:
+            return self._destroy(pooled)
+
+        memory_mb = browser_memory_mb(pooled.driver)
+        if memory_mb is not None and memory_mb > self.max_memory_mb:
+            return self._destroy(pooled)
+
+        try:
+            self._reset(pooled.driver)
+        except Exception:
+            return self._destroy(pooled)
+
+        with self._cond:
+            if self._closed:
+                self._total -= 1
+            else:
+                self._idle.append(pooled)
+                self._cond.notify()
+                return
+        self._quit(pooled)
+
+    def _destroy(self, pooled):
+        with self._cond:
+            self._leased.pop(id(pooled.driver), None)
+            self._total -= 1
+            self.recycled += 1
+            self._cond.notify()
+            closed = self._closed
+        self._quit(pooled)
+        if not closed:
+            # Replace the recycled browser so the next lease stays warm
+            self.start_background()
+
+    def _spawn(self):
+        return PooledDriver(self.factory())
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except:
+            pass
+
+    def _is_healthy(self, pooled):
+        try:
+            return pooled.driver.execute_script("return 1;") == 1
+        except:
+            return False
+
+    def _reset(self, driver):
+        # Close any extra tabs, then wipe cookies, cache and per-origin storage
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in self.reset_origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                "origin": origin,
+                "storageTypes": "all"
+            })
+
+
+def browser_memory_mb(driver):
+    """Resident memory of the browser process tree in MB, or None when unavailable"""
+    pid = getattr(driver, 'browser_pid', None)
+    if not pid:
+        return None
+
+    total_kb = 0
+    pending = [pid]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            if current == pid:
+                return None
+            continue
+        try:
+            for tid in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{tid}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            pass
+    return total_kb / 1024
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from product import FIELDS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+PRODUCT_FIELDS = FIELDS
+OBSERVATION_FIELDS = ('observed_at', 'run_id', 'query', 'source', 'product_key', 'title', 'price', 'price_num',
+                      'rating', 'category', 'url', 'image')
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Fields that are numbers in stored rows; everything else is exported as text
+NUMERIC = {'price_num': 'int64', 'mrp': 'int64', 'discount_pct': 'int64', 'rating': 'float64',
+           'run_id': 'int64', 'observed_at': 'float64'}
+
+
+class ExportError(Exception):
+    pass
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ndjson_chunks(rows, fields, batch_size=500):
+    for batch in batches(rows, batch_size):
+        yield ''.join(json.dumps({f: row.get(f) for f in fields}, ensure_ascii=False) + '\n'
+                      for row in batch).encode('utf-8')
+
+
+def csv_chunks(rows, fields, batch_size=500):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fields, extrasaction='ignore')
+    writer.writeheader()
+    for batch in batches(rows, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._parts = []
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_chunks(rows, fields, batch_size=5000):
+    """One row group per batch, so only a batch is ever held in memory"""
+    schema = pyarrow.schema([(f, pyarrow.type_for_alias(NUMERIC.get(f, 'string'))) for f in fields])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='snappy')
+    for batch in batches(rows, batch_size):
+        columns = {f: [_cell(row.get(f), f) for row in batch] for f in fields}
+        writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _cell(value, field):
+    if value is None:
+        return None
+    kind = NUMERIC.get(field)
+    if kind is None:
+        return str(value)
+    try:
+        return int(value) if kind == 'int64' else float(value)
+    except ValueError:
+        # e.g. ratings stored as free text before they were parsed
+        return None
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(rows, fmt='ndjson', fields=PRODUCT_FIELDS, gzip=False):
+    """Encode rows lazily; returns (chunk iterator, mimetype, file extension).
+
+    Raises ExportError for unknown formats or missing optional dependencies.
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f'Unknown export format: {fmt}')
+    if fmt == 'parquet' and pyarrow is None:
+        raise ExportError('Parquet export requires pyarrow')
+    encode = {'ndjson': ndjson_chunks, 'csv': csv_chunks, 'parquet': parquet_chunks}[fmt]
+    chunks = encode(rows, fields)
+    mimetype, extension = FORMATS[fmt]
+    if gzip:
+        # Parquet pages are already compressed; gzip mostly matters for the text formats
+        return gzip_chunks(chunks), 'application/gzip', extension + '.gz'
+    return chunks, mimetype, extension
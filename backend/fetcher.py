@@ -0,0 +1,191 @@
+import json
+import re
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import etree, html
+from cssselect import HTMLTranslator
+
+from sites import SITES
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-IN,en;q=0.9"
+}
+
+# Pages that look like a bot wall rather than search results
+BLOCK_MARKERS = re.compile(
+    r'captcha|robot check|are you a human|access denied|unusual traffic|'
+    r'api-services-support@amazon\.com|request blocked',
+    re.I
+)
+
+WHITESPACE = re.compile(r'\s+')
+
+_translator = HTMLTranslator()
+
+
+def _compile(selector, prefix):
+    return etree.XPath(_translator.css_to_xpath(selector, prefix=prefix))
+
+
+class CompiledField:
+    def __init__(self, spec):
+        self.attrs = spec.get('attrs', ['text'])
+        self.min_length = spec.get('min_length', 0)
+        self.all = spec.get('all', False)
+        self.href = spec.get('href', False)
+        self.pattern = re.compile(spec['pattern'], re.I) if spec.get('pattern') else None
+        self.fallback_pattern = re.compile(spec['fallback_pattern']) if spec.get('fallback_pattern') else None
+        self.closest = _compile(spec['closest'], 'ancestor::') if spec.get('closest') else None
+        # None stands for ':scope', the container itself
+        self.selectors = [None if sel == ':scope' else _compile(sel, 'descendant::')
+                          for sel in spec.get('selectors', [])]
+
+
+class CompiledSite:
+    """Selector plan of one site compiled to XPath for the HTML parser"""
+
+    def __init__(self, site):
+        self.site = site
+        self.containers = [_compile(sel, 'descendant-or-self::') for sel in site.containers]
+        self.container_xpath = etree.XPath(site.container_xpath) if site.container_xpath else None
+        self.fields = {name: CompiledField(spec) for name, spec in site.fields.items()}
+
+
+PLANS = {key: CompiledSite(site) for key, site in SITES.items()}
+
+
+def read(el, attr, base_url):
+    if attr in ('text', 'textContent'):
+        return WHITESPACE.sub(' ', el.text_content()).strip()
+    value = (el.get(attr) or '').strip()
+    # Mirror DOM properties, which resolve href/src to absolute URLs
+    if value and attr in ('href', 'src'):
+        value = urljoin(base_url, value)
+    return value
+
+
+def extract_field(container, field, base_url):
+    groups = []
+    if field.closest is not None:
+        ancestors = field.closest(container)
+        if ancestors:
+            groups.append([ancestors[-1]])
+    for selector in field.selectors:
+        if selector is None:
+            groups.append([container])
+        else:
+            found = selector(container)
+            groups.append(found if field.all else found[:1])
+
+    for group in groups:
+        for el in group:
+            value = ''
+            for attr in field.attrs:
+                value = read(el, attr, base_url)
+                if value:
+                    break
+            if len(value) > field.min_length and (not field.pattern or field.pattern.search(value)):
+                href = urljoin(base_url, el.get('href', '')) if el.tag == 'a' else None
+                return value, href
+
+    if field.fallback_pattern:
+        match = field.fallback_pattern.search(container.text_content())
+        if match:
+            return match.group().strip(), None
+    return None, None
+
+
+def parse_rows(site_key, page, base_url, limit=None):
+    """Extract rows from server-rendered HTML the same way the in-page extractor does"""
+    plan = PLANS[site_key]
+    site = plan.site
+    limit = limit or site.limit
+    root = html.fromstring(page)
+
+    containers = []
+    for selector in plan.containers:
+        found = selector(root)
+        if len(found) >= site.min_containers:
+            containers = found
+            break
+    if not containers and plan.container_xpath is not None:
+        containers = plan.container_xpath(root)
+
+    rows = []
+    for container in containers[:limit]:
+        row = {}
+        for name, field in plan.fields.items():
+            value, href = extract_field(container, field, base_url)
+            row[name] = value
+            if field.href:
+                row[f'{name}_href'] = href
+        rows.append(row)
+
+    return rows or parse_json_ld(root, base_url, limit)
+
+
+def parse_json_ld(root, base_url, limit):
+    """Fallback for pages that embed their listing as schema.org JSON-LD"""
+    rows = []
+    for script in root.xpath('//script[@type="application/ld+json"]/text()'):
+        try:
+            data = json.loads(script)
+        except ValueError:
+            continue
+        for item in _json_ld_products(data):
+            offers = item.get('offers') or {}
+            if isinstance(offers, list):
+                offers = offers[0] if offers else {}
+            rating = item.get('aggregateRating') or {}
+            image = item.get('image')
+            if isinstance(image, list):
+                image = image[0] if image else None
+            price = offers.get('price') or offers.get('lowPrice')
+            rows.append({
+                'title': item.get('name'),
+                'price': f"₹{price}" if price is not None else None,
+                'rating': str(rating['ratingValue']) if rating.get('ratingValue') else None,
+                'url': urljoin(base_url, item['url']) if item.get('url') else None,
+                'image': image
+            })
+            if len(rows) >= limit:
+                return rows
+    return rows
+
+
+def _json_ld_products(data):
+    if isinstance(data, list):
+        for entry in data:
+            yield from _json_ld_products(entry)
+    elif isinstance(data, dict):
+        if data.get('@type') == 'Product':
+            yield data
+        for key in ('@graph', 'itemListElement', 'item'):
+            if key in data:
+                yield from _json_ld_products(data[key])
+
+
+class HttpFetcher:
+    """Keep-alive HTTP client that tries server-rendered pages before a browser is used"""
+
+    def __init__(self, timeout=10, pool_size=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=len(SITES), pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def fetch_rows(self, site_key, url, limit=None):
+        """Return parsed rows, or None when the page is blocked or empty and needs a browser"""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200 or BLOCK_MARKERS.search(response.text[:20000]):
+            return None
+        return parse_rows(site_key, response.text, response.url, limit) or None
@@ -0,0 +1,122 @@
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Outcomes that count against a site. 'empty' does not: a real no-results page looks the same
+FAILURES = ('blocked', 'error', 'timeout')
+
+
+class CircuitBreaker:
+    """Trips after `threshold` consecutive failures; after a cooldown one probe is let through.
+
+    A failed probe reopens the breaker with the cooldown doubled, up to max_cooldown.
+    """
+
+    def __init__(self, threshold=3, cooldown=120, max_cooldown=1800):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.last_failure = None
+        self.opened_at = None
+        self.probe_started = None
+
+    def allow(self, now):
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self.probe_started = now
+            return True
+        # A probe that never reported back (worker died) should not block the site forever
+        if self.state == HALF_OPEN and now - self.probe_started >= self.cooldown:
+            self.probe_started = now
+            return True
+        return False
+
+    def success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+
+    def failure(self, reason, now):
+        self.failures += 1
+        self.last_failure = reason
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.state = OPEN
+            self.opened_at = now
+        elif self.state == CLOSED and self.failures >= self.threshold:
+            self.state = OPEN
+            self.opened_at = now
+
+    def to_status(self, now):
+        status = {'state': self.state, 'failures': self.failures, 'last_failure': self.last_failure}
+        if self.state == OPEN:
+            status['retry_in'] = round(max(0, self.opened_at + self.cooldown - now), 1)
+        return status
+
+
+class SiteHealth:
+    """One circuit breaker per retailer, shared by every scrape in the process"""
+
+    def __init__(self, threshold=3, cooldown=120, max_cooldown=1800):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, site_key):
+        breaker = self._breakers.get(site_key)
+        if breaker is None:
+            breaker = self._breakers[site_key] = CircuitBreaker(self.threshold, self.cooldown, self.max_cooldown)
+        return breaker
+
+    def allow(self, site_key):
+        with self._lock:
+            return self._breaker(site_key).allow(time.time())
+
+    def record(self, site_key, failure=None):
+        """Report how a scrape went: failure is None on success, else a reason like 'blocked'.
+
+        Other reasons such as 'empty' are neutral: they neither reset nor extend the failure streak.
+        """
+        if failure is not None and failure not in FAILURES:
+            return
+        with self._lock:
+            breaker = self._breaker(site_key)
+            previous = breaker.state
+            if failure:
+                breaker.failure(failure, time.time())
+            else:
+                breaker.success()
+            state = breaker.state
+        if state != previous:
+            print(f"  🔌 {site_key} circuit {previous} -> {state}" + (f" ({failure})" if failure else ""))
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            return {site: breaker.to_status(now) for site, breaker in self._breakers.items()}
+
+
+# Most restrictive first, for merging the views of several processes
+SEVERITY = {OPEN: 0, HALF_OPEN: 1, CLOSED: 2}
+
+
+def merge_snapshots(snapshots):
+    """One status per site from several SiteHealth snapshots: the most restrictive breaker wins"""
+    merged = {}
+    for snapshot in snapshots:
+        for site, status in snapshot.items():
+            current = merged.get(site)
+            if current is None or ((SEVERITY[status['state']], -status['failures']) <
+                                   (SEVERITY[current['state']], -current['failures'])):
+                merged[site] = status
+    return merged
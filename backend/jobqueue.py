@@ -0,0 +1,472 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from jobs import PRIORITY_USER, QueueFullError
+from metrics import JOB_SECONDS
+from product import Product, to_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    websites TEXT,
+    deep INTEGER NOT NULL DEFAULT 0,
+    cache_key TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    cached INTEGER NOT NULL DEFAULT 0,
+    results TEXT,
+    ready_times TEXT,
+    site_status TEXT,
+    source TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    requested_at REAL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (state, priority, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (cache_key, state);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_requested ON jobs (requested_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    stats TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _key_from_json(text):
+    query, sites, *rest = json.loads(text)
+    return (query, tuple(sites), *rest)
+
+
+class JobQueue:
+    """SQLite-backed scrape queue shared by the web processes and the worker processes"""
+
+    def __init__(self, path='data/jobs.db'):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Queues created before per-site outcomes and cache hit references were tracked
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column in ('site_status', 'source'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; writes that must be atomic across processes use _transaction
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def enqueue(self, query, websites, cache_key, priority=PRIORITY_USER, deep=False, max_queue=20):
+        """Queue a scrape, or return the queued/running job for the same key.
+
+        Returns (job_id, created). Raises QueueFullError when the queue is at capacity.
+        """
+        key = json.dumps(cache_key)
+        now = time.time()
+        requested_at = now if priority == PRIORITY_USER else None
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id FROM jobs WHERE cache_key = ? AND state IN ('queued', 'running') "
+                               "ORDER BY created_at LIMIT 1", (key,)).fetchone()
+            if row:
+                if requested_at:
+                    # A user waiting on a queued refresh or watch job lifts it to user priority
+                    conn.execute("UPDATE jobs SET requested_at = ?, priority = MIN(priority, ?) WHERE id = ?",
+                                 (requested_at, priority, row['id']))
+                return row['id'], False
+
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+            if queued >= max_queue:
+                raise QueueFullError('Too many searches in progress')
+
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO jobs (id, query, websites, deep, cache_key, priority, state, message, "
+                "created_at, requested_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, query, json.dumps(websites), int(deep), key, priority,
+                 'Waiting for a free scraper...', now, requested_at))
+            return job_id, True
+
+    def add_completed(self, query, websites, cache_key, results, source=None):
+        """Insert a job answered without scraping, e.g. from cache.
+
+        When the results are those of job `source`, the row only refers to that job and serves
+        its results; they are copied in only when the source job is gone.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        if source:
+            # One small insert, no events: QueuedJob replays a cache hit from the source's results
+            inserted = self._conn().execute(
+                "INSERT INTO jobs (id, query, websites, cache_key, priority, state, progress, message, cached, "
+                "source, ready_times, created_at, requested_at, finished_at) "
+                "SELECT ?, ?, ?, ?, ?, 'done', 100, message, 1, id, '{}', ?, ?, ? "
+                "FROM jobs WHERE id = ? AND state = 'done'",
+                (job_id, query, json.dumps(websites), json.dumps(cache_key), PRIORITY_USER,
+                 now, now, now, source)).rowcount
+            if inserted:
+                return job_id
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, query, websites, cache_key, priority, state, progress, message, cached, "
+                "results, ready_times, created_at, requested_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, 'done', 100, ?, 1, ?, '{}', ?, ?, ?)",
+                (job_id, query, json.dumps(websites), json.dumps(cache_key), PRIORITY_USER,
+                 f'Found {len(results)} products', json.dumps(results, default=to_json), now, now, now))
+            self._publish(conn, job_id, 'site', {'site': 'cache', 'products': results})
+            self._publish(conn, job_id, 'done', {'count': len(results), 'ready_times': {}})
+        return job_id
+
+    def claim(self, worker):
+        """Atomically take the highest-priority queued job; returns its id or None"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id FROM jobs WHERE state = 'queued' "
+                               "ORDER BY priority, created_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET state = 'running', worker = ?, attempts = attempts + 1, "
+                         "started_at = ?, heartbeat_at = ? WHERE id = ?", (worker, now, now, row['id']))
+            return row['id']
+
+    def heartbeat(self, job_id):
+        self._conn().execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def requeue_stale(self, stale_after=120, max_attempts=2):
+        """Put jobs of workers that stopped heartbeating back in the queue, or fail them after retries"""
+        cutoff = time.time() - stale_after
+        with self._transaction() as conn:
+            stale = conn.execute("SELECT id, attempts FROM jobs WHERE state = 'running' AND heartbeat_at < ?",
+                                 (cutoff,)).fetchall()
+            for row in stale:
+                if row['attempts'] < max_attempts:
+                    conn.execute("UPDATE jobs SET state = 'queued', worker = NULL, message = ? WHERE id = ?",
+                                 ('Scraper worker lost, retrying...', row['id']))
+                else:
+                    self._fail(conn, row['id'], 'Error: scraper worker stopped responding')
+        return len(stale)
+
+    def update(self, job_id, progress, message):
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ?", (progress, message, job_id))
+            self._publish(conn, job_id, 'progress', {'progress': progress, 'message': message})
+
+    def set_ready_times(self, job_id, ready_times):
+        self._conn().execute("UPDATE jobs SET ready_times = ? WHERE id = ?", (json.dumps(ready_times), job_id))
+
+    def set_site_status(self, job_id, site_status):
+        self._conn().execute("UPDATE jobs SET site_status = ? WHERE id = ?", (json.dumps(site_status), job_id))
+
+    def publish(self, job_id, event, data):
+        with self._transaction() as conn:
+            self._publish(conn, job_id, event, data)
+
+    def _publish(self, conn, job_id, event, data):
+        conn.execute("INSERT INTO job_events (job_id, seq, event, data) "
+                     "SELECT ?, COALESCE(MAX(seq) + 1, 0), ?, ? FROM job_events WHERE job_id = ?",
+                     (job_id, event, json.dumps(data, ensure_ascii=False, default=to_json), job_id))
+
+    def events(self, job_id, cursor):
+        rows = self._conn().execute("SELECT event, data FROM job_events WHERE job_id = ? AND seq >= ? ORDER BY seq",
+                                    (job_id, cursor))
+        return [(row['event'], json.loads(row['data'])) for row in rows]
+
+    def finish(self, job_id, results):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE jobs SET state = 'done', progress = 100, message = ?, results = ?, finished_at = ? "
+                         "WHERE id = ?", (f'Found {len(results)} products', json.dumps(results, default=to_json), now, job_id))
+            row = conn.execute("SELECT ready_times, site_status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            self._publish(conn, job_id, 'done', {'count': len(results),
+                                                 'ready_times': json.loads(row['ready_times'] or '{}'),
+                                                 'sites': json.loads(row['site_status'] or '{}')})
+
+    def fail(self, job_id, message):
+        with self._transaction() as conn:
+            self._fail(conn, job_id, message)
+
+    def _fail(self, conn, job_id, message):
+        conn.execute("UPDATE jobs SET state = 'error', message = ?, finished_at = ? WHERE id = ?",
+                     (message, time.time(), job_id))
+        self._publish(conn, job_id, 'error', {'message': message})
+
+    def row(self, job_id):
+        return self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def latest(self, finished=False):
+        condition = "AND state = 'done'" if finished else ""
+        row = self._conn().execute(f"SELECT id FROM jobs WHERE requested_at IS NOT NULL {condition} "
+                                   f"ORDER BY requested_at DESC LIMIT 1").fetchone()
+        return row['id'] if row else None
+
+    def finished_since(self, since):
+        """Scraped (not cache-served) jobs that finished after `since`, oldest first"""
+        return self._conn().execute("SELECT id, finished_at FROM jobs WHERE finished_at > ? AND cached = 0 "
+                                    "ORDER BY finished_at", (since,)).fetchall()
+
+    def depth(self):
+        return self._conn().execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+
+    def state_counts(self):
+        rows = self._conn().execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")
+        return {row['state']: row['n'] for row in rows}
+
+    def report_worker(self, name, stats):
+        """Store a worker's latest breaker, browser pool and metric snapshot for the web processes"""
+        self._conn().execute("INSERT INTO workers (name, stats, updated_at) VALUES (?, ?, ?) "
+                             "ON CONFLICT (name) DO UPDATE SET stats = excluded.stats, updated_at = excluded.updated_at",
+                             (name, json.dumps(stats), time.time()))
+
+    def worker_stats(self, max_age=None):
+        """Latest snapshot per worker, only of workers that reported within max_age seconds if given"""
+        cutoff = time.time() - max_age if max_age else 0
+        rows = self._conn().execute("SELECT name, stats FROM workers WHERE updated_at >= ?", (cutoff,))
+        return {row['name']: json.loads(row['stats']) for row in rows}
+
+    def prune(self, max_age=6 * 3600):
+        cutoff = time.time() - max_age
+        # Jobs still referred to by a later cache hit stay until that one goes
+        expired = ("SELECT id FROM jobs WHERE finished_at < ? AND id NOT IN "
+                   "(SELECT source FROM jobs WHERE source IS NOT NULL AND finished_at >= ?)")
+        with self._transaction() as conn:
+            conn.execute(f"DELETE FROM job_events WHERE job_id IN ({expired})", (cutoff, cutoff))
+            conn.execute(f"DELETE FROM jobs WHERE id IN ({expired})", (cutoff, cutoff))
+            # Stopped workers' metric totals still count until then
+            conn.execute("DELETE FROM workers WHERE updated_at < ?", (cutoff,))
+
+
+class QueuedJob:
+    """Handle on a job row, with the same interface as jobs.Job for the web routes and the runner"""
+
+    def __init__(self, queue, row):
+        self.queue = queue
+        self.id = row['id']
+        self.query = row['query']
+        self.websites = json.loads(row['websites']) if row['websites'] else None
+        self.deep = bool(row['deep'])
+        self.cache_key = _key_from_json(row['cache_key'])
+        self.priority = row['priority']
+        self.cached = bool(row['cached'])
+        # Cache hits refer to the job whose results they serve
+        self.source = row['source']
+        self.created_at = row['created_at']
+        self.groups = None
+        self.view = None
+        self._results = None
+
+    def _get(self, column):
+        row = self.queue.row(self.id)
+        return row[column] if row else None
+
+    @property
+    def state(self):
+        return self._get('state')
+
+    @property
+    def is_finished(self):
+        return self.state in ('done', 'error')
+
+    @property
+    def results(self):
+        # Results never change once written, so parse them once
+        if self._results is None:
+            row = self.queue.row(self.source or self.id)
+            text = row['results'] if row else None
+            self._results = [Product.from_dict(p) for p in json.loads(text)] if text else None
+        return self._results
+
+    @property
+    def finished_at(self):
+        return self._get('finished_at')
+
+    @property
+    def ready_times(self):
+        return json.loads(self._get('ready_times') or '{}')
+
+    @ready_times.setter
+    def ready_times(self, value):
+        self.queue.set_ready_times(self.id, value)
+
+    @property
+    def site_status(self):
+        return json.loads(self._get('site_status') or '{}')
+
+    @site_status.setter
+    def site_status(self, value):
+        self.queue.set_site_status(self.id, value)
+
+    def publish(self, event, data):
+        self.queue.publish(self.id, event, data)
+
+    def update(self, progress, message):
+        self.queue.update(self.id, progress, message)
+
+    def events_since(self, cursor, timeout=15, poll=0.25):
+        """Poll until events after cursor exist (or timeout) and return them"""
+        if self.source:
+            results = self.results or []
+            return [('site', {'site': 'cache', 'products': results}),
+                    ('done', {'count': len(results), 'ready_times': {}})][cursor:]
+        deadline = time.time() + timeout
+        while True:
+            events = self.queue.events(self.id, cursor)
+            if events or time.time() >= deadline:
+                return events
+            time.sleep(poll)
+
+    def to_status(self):
+        row = self.queue.row(self.id)
+        ready_times = json.loads(row['ready_times'] or '{}')
+        return {
+            'job_id': self.id,
+            'state': row['state'],
+            'is_running': row['state'] in ('queued', 'running'),
+            'progress': row['progress'],
+            'message': row['message'],
+            'last_search': self.query,
+            'deep': self.deep,
+            'cached': self.cached,
+            'ready_times': {site: round(t, 2) for site, t in ready_times.items()},
+            'sites': json.loads(row['site_status'] or '{}')
+        }
+
+
+class QueuedJobManager:
+    """JobManager counterpart for process mode: jobs go to the shared queue and run in worker processes.
+
+    on_finish(job) is called once for every scraped job that finishes, in whichever process
+    created the manager, e.g. to warm that process's result cache.
+    """
+
+    def __init__(self, queue, max_queue=20, on_finish=None, poll=1.0, max_handles=200):
+        self.queue = queue
+        self.max_queue = max_queue
+        self.on_finish = on_finish
+        self.poll = poll
+        self.max_handles = max_handles
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+        if on_finish:
+            thread = threading.Thread(target=self._watch, name='job-results', daemon=True)
+            thread.start()
+
+    def submit(self, query, websites, cache_key, priority=PRIORITY_USER, deep=False):
+        job_id, created = self.queue.enqueue(query, websites, cache_key, priority, deep, self.max_queue)
+        return self.get(job_id), created
+
+    def add_completed(self, query, websites, cache_key, results, source=None):
+        return self.get(self.queue.add_completed(query, websites, cache_key, results, source))
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._handles.get(job_id)
+            if job is not None:
+                self._handles.move_to_end(job_id)
+                return job
+        row = self.queue.row(job_id)
+        if row is None:
+            return None
+        job = QueuedJob(self.queue, row)
+        with self._lock:
+            self._handles[job_id] = job
+            while len(self._handles) > self.max_handles:
+                self._handles.popitem(last=False)
+        return job
+
+    def latest(self, finished=False):
+        job_id = self.queue.latest(finished)
+        return self.get(job_id) if job_id else None
+
+    def queue_depth(self):
+        return self.queue.depth()
+
+    def stats(self):
+        return {'queued': self.queue_depth(), 'capacity': self.max_queue, 'jobs': self.queue.state_counts()}
+
+    def _watch(self):
+        since = time.time()
+        while True:
+            time.sleep(self.poll)
+            try:
+                for row in self.queue.finished_since(since):
+                    since = row['finished_at']
+                    job = self.get(row['id'])
+                    if job and job.state == 'done':
+                        self.on_finish(job)
+            except Exception as e:
+                print(f"Job results watcher error: {e}")
+
+
+def work(queue, runner, name, poll=1.0, stale_after=120, heartbeat=10):
+    """Worker process loop: claim a job, run it, write back results; runs until killed"""
+    print(f"🛠️ Scrape worker {name} ready")
+    while True:
+        queue.requeue_stale(stale_after)
+        job_id = queue.claim(name)
+        if job_id is None:
+            time.sleep(poll)
+            continue
+
+        job = QueuedJob(queue, queue.row(job_id))
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(heartbeat):
+                queue.heartbeat(job_id)
+
+        threading.Thread(target=beat, daemon=True).start()
+        started = time.time()
+        job.update(10, 'Scraping products...')
+        try:
+            results = runner(job)
+        except Exception as e:
+            print(f"Scraping error: {e}")
+            queue.fail(job_id, f'Error: {str(e)}')
+        else:
+            queue.finish(job_id, results)
+        finally:
+            stop.set()
+            JOB_SECONDS.observe(time.time() - started, state=job.state)
@@ -0,0 +1,206 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from queue import PriorityQueue, Full
+
+from metrics import JOB_SECONDS
+
+PRIORITY_USER = 0
+PRIORITY_REFRESH = 10
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, query, websites, cache_key, priority=PRIORITY_USER, deep=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.websites = websites
+        self.deep = deep
+        self.cache_key = cache_key
+        self.priority = priority
+        self.state = 'queued'
+        self.progress = 0
+        self.message = 'Waiting for a free scraper...'
+        self.results = None
+        self.groups = None
+        self.view = None
+        self.ready_times = {}
+        # Per-site outcome: 'ok', 'skipped' (circuit open), 'blocked', 'empty', 'error' or 'timeout'
+        self.site_status = {}
+        self.cached = False
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        self._events = []
+        self._cond = threading.Condition()
+
+    def publish(self, event, data):
+        with self._cond:
+            self._events.append((event, data))
+            self._cond.notify_all()
+
+    def update(self, progress, message):
+        self.progress = progress
+        self.message = message
+        self.publish('progress', {'progress': progress, 'message': message})
+
+    def events_since(self, cursor, timeout=15):
+        """Block until events after cursor exist (or timeout) and return them"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._events) > cursor, timeout=timeout)
+            return self._events[cursor:]
+
+    @property
+    def is_finished(self):
+        return self.state in ('done', 'error')
+
+    def to_status(self):
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'is_running': self.state in ('queued', 'running'),
+            'progress': self.progress,
+            'message': self.message,
+            'last_search': self.query,
+            'deep': self.deep,
+            'cached': self.cached,
+            'ready_times': {site: round(t, 2) for site, t in self.ready_times.items()},
+            'sites': self.site_status
+        }
+
+
+class JobManager:
+    """Runs scrape jobs on a fixed worker pool fed by a bounded priority queue"""
+
+    def __init__(self, runner, workers=2, max_queue=20, max_jobs=200):
+        self.runner = runner
+        self.max_jobs = max_jobs
+        self._queue = PriorityQueue(maxsize=max_queue)
+        self._seq = itertools.count()
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._latest = None
+        self._latest_done = None
+        self._lock = threading.Lock()
+
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f'scrape-worker-{i}', daemon=True)
+            thread.start()
+
+    def submit(self, query, websites, cache_key, priority=PRIORITY_USER, deep=False):
+        """Queue a scrape, or return the in-flight job for the same key.
+
+        Returns (job, created). Raises QueueFullError when the queue is at capacity.
+        """
+        with self._lock:
+            job = self._active.get(cache_key)
+            if job is not None:
+                if priority == PRIORITY_USER:
+                    self._latest = job
+                if priority < job.priority and job.state == 'queued':
+                    # A user now waits on this refresh or watch job: queue it again at user
+                    # priority; workers skip whichever entry comes second
+                    try:
+                        self._queue.put_nowait((priority, next(self._seq), job))
+                        job.priority = priority
+                    except Full:
+                        pass
+                return job, False
+
+            job = Job(query, websites, cache_key, priority, deep)
+            try:
+                self._queue.put_nowait((priority, next(self._seq), job))
+            except Full:
+                raise QueueFullError('Too many searches in progress')
+            self._active[cache_key] = job
+            if priority == PRIORITY_USER:
+                self._latest = job
+            self._remember(job)
+            return job, True
+
+    def add_completed(self, query, websites, cache_key, results, source=None):
+        """Register a job that was answered without scraping, e.g. from cache.
+
+        source (the id of the job the results came from) is unused: the results are held in memory anyway.
+        """
+        job = Job(query, websites, cache_key)
+        job.cached = True
+        job.publish('site', {'site': 'cache', 'products': results})
+        self._finish(job, results)
+        with self._lock:
+            self._latest = self._latest_done = job
+            self._remember(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self, finished=False):
+        """The most recent user search, or the most recent one that has finished"""
+        return self._latest_done if finished else self._latest
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+        return {'queued': self.queue_depth(), 'capacity': self._queue.maxsize, 'jobs': states}
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        # Drop the oldest finished jobs once over the retention limit
+        if len(self._jobs) > self.max_jobs:
+            for job_id in [jid for jid, j in self._jobs.items() if j.is_finished]:
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            with self._lock:
+                if job.state != 'queued':
+                    # Second entry of a job re-queued at a higher priority
+                    continue
+                job.state = 'running'
+            job.started_at = time.time()
+            job.update(10, 'Scraping products...')
+            try:
+                results = self.runner(job)
+            except Exception as e:
+                print(f"Scraping error: {e}")
+                job.state = 'error'
+                job.message = f'Error: {str(e)}'
+                job.finished_at = time.time()
+                job.done.set()
+                job.publish('error', {'message': job.message})
+            else:
+                self._finish(job, results)
+            finally:
+                JOB_SECONDS.observe(time.time() - job.started_at, state=job.state)
+                with self._lock:
+                    if self._active.get(job.cache_key) is job:
+                        del self._active[job.cache_key]
+                self._queue.task_done()
+
+    def _finish(self, job, results):
+        job.results = results
+        job.state = 'done'
+        job.progress = 100
+        job.message = f'Found {len(results)} products'
+        job.finished_at = time.time()
+        job.done.set()
+        if job is self._latest:
+            self._latest_done = job
+        status = job.to_status()
+        job.publish('done', {'count': len(results), 'ready_times': status['ready_times'], 'sites': status['sites']})
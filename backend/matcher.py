@@ -0,0 +1,64 @@
+import re
+from functools import lru_cache
+
+ACCESSORY_KEYWORDS = ['cover', 'case', 'protector', 'charger', 'cable', 'adapter',
+                      'earphone', 'headphone', 'stand', 'holder', 'skin', 'bumper']
+
+# Checked in order: the first category with a matching keyword wins
+CATEGORY_KEYWORDS = {
+    'Mobile Phones': ['phone', 'mobile', 'iphone', 'samsung', 'oneplus', 'pixel'],
+    'Laptops': ['laptop', 'notebook', 'macbook', 'chromebook'],
+    'Television': ['tv', 'television', 'smart tv'],
+    'Groceries': ['rice', 'wheat', 'oil', 'dal', 'sugar', 'tea', 'coffee'],
+    'Home Appliances': ['mixer', 'grinder', 'cooker', 'refrigerator', 'washing machine']
+}
+DEFAULT_CATEGORY = "General Products"
+
+ACCESSORY_PATTERN = re.compile('|'.join(map(re.escape, ACCESSORY_KEYWORDS)))
+# One alternation per category, tried in priority order
+CATEGORY_PATTERNS = [(category, re.compile('|'.join(map(re.escape, keywords))))
+                     for category, keywords in CATEGORY_KEYWORDS.items()]
+IPHONE_MODEL = re.compile(r'iphone\s*(\d+)')
+
+
+def categorize(title):
+    title_lower = title.lower()
+    for category, pattern in CATEGORY_PATTERNS:
+        if pattern.search(title_lower):
+            return category
+    return DEFAULT_CATEGORY
+
+
+class QueryMatcher:
+    """Relevance filter for one search query, prepared once and reused for every title"""
+
+    def __init__(self, query):
+        query_lower = query.lower()
+        self.words = [w for w in query_lower.split() if len(w) > 2]
+        self.required = len(self.words) / 2
+        model = IPHONE_MODEL.search(query_lower) if 'iphone' in query_lower else None
+        self.iphone_model = model.group(1) if model else None
+
+    def is_relevant(self, title):
+        if not title or len(title) < 3:
+            return False
+
+        title_lower = title.lower()
+        if ACCESSORY_PATTERN.search(title_lower):
+            return False
+
+        # iPhone model matching
+        if self.iphone_model:
+            title_model = IPHONE_MODEL.search(title_lower)
+            if title_model:
+                return title_model.group(1) == self.iphone_model
+
+        # General matching
+        if not self.words:
+            return False
+        return sum(1 for word in self.words if word in title_lower) >= self.required
+
+
+@lru_cache(maxsize=256)
+def matcher_for(query):
+    return QueryMatcher(query)
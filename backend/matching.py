@@ -0,0 +1,149 @@
+import re
+from collections import defaultdict, namedtuple
+
+BRANDS = {
+    'apple', 'samsung', 'oneplus', 'xiaomi', 'realme', 'vivo', 'oppo',
+    'motorola', 'google', 'nokia', 'nothing', 'sony', 'lg', 'hp', 'dell', 'lenovo', 'asus', 'acer',
+    'msi', 'boat', 'jbl', 'philips', 'bajaj', 'prestige', 'tata', 'aashirvaad', 'fortune', 'amul'
+}
+# Sub-brands sold with or without their parent's name ("Redmi Note 12" / "Xiaomi Redmi Note 12")
+BRAND_ALIASES = {
+    'redmi': 'xiaomi', 'poco': 'xiaomi', 'mi': 'xiaomi', 'nord': 'oneplus', 'iqoo': 'vivo',
+    'narzo': 'realme', 'moto': 'motorola', 'rog': 'asus', 'tuf': 'asus', 'predator': 'acer',
+    'omen': 'hp', 'alienware': 'dell', 'thinkpad': 'lenovo', 'ideapad': 'lenovo', 'legion': 'lenovo'
+}
+# Product lines that imply a brand when the brand itself is omitted
+LINE_BRANDS = {'iphone': 'apple', 'ipad': 'apple', 'macbook': 'apple', 'galaxy': 'samsung', 'pixel': 'google'}
+MODEL_WORDS = {
+    'iphone', 'ipad', 'macbook', 'galaxy', 'pixel', 'note', 'pro', 'max', 'plus', 'ultra',
+    'mini', 'lite', 'fe', 'air', 'neo', 'prime', 'edge', 'fold', 'flip'
+}
+COLORS = {
+    'black', 'white', 'blue', 'green', 'red', 'pink', 'purple', 'yellow', 'gold', 'silver',
+    'grey', 'gray', 'graphite', 'midnight', 'starlight', 'titanium', 'orange', 'cream', 'violet'
+}
+NOISE = {'5g', '4g', 'lte', 'with', 'and', 'the', 'for', 'new', 'latest', 'edition', 'storage', 'ram', 'rom'}
+
+NETWORK = re.compile(r'\b[2-5]g\b')
+STORAGE = re.compile(r'(\d+(?:\.\d+)?)\s*(gb|tb)\b(\s*ram)?')
+MEASURE = re.compile(r'(\d+(?:\.\d+)?)\s*(cm|inch|inches|mm|mah|mp|hz|w|kg|g|gm|ml|l|ltr)\b')
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+UNITS = {'inch': 'in', 'inches': 'in', 'gm': 'g', 'ltr': 'l'}
+
+Signature = namedtuple('Signature', 'brand model storage color size')
+
+
+def normalize_title(title):
+    return ' '.join(NON_ALNUM.sub(' ', title.lower()).split())
+
+
+def signature(title):
+    """Pull brand, model tokens, storage (GB), color and pack size out of a listing title"""
+    text = title.lower()
+
+    storage = None
+    for amount, unit, ram in STORAGE.findall(text):
+        if ram:
+            continue
+        gb = float(amount) * (1024 if unit == 'tb' else 1)
+        storage = max(storage or 0, gb)
+    text = STORAGE.sub(' ', text)
+
+    # "5G" is a network, not five grams
+    text = NETWORK.sub(' ', text)
+    measures = [(amount, UNITS.get(unit, unit)) for amount, unit in MEASURE.findall(text)]
+    # Screens are often given in cm and inches; keep one so both spellings of a title agree
+    if any(unit == 'in' for _, unit in measures):
+        measures = [(amount, unit) for amount, unit in measures if unit != 'cm']
+    sizes = sorted({f"{float(amount):g}{unit}" for amount, unit in measures})
+    text = MEASURE.sub(' ', text)
+
+    tokens = normalize_title(text).split()
+    color = next((t for t in tokens if t in COLORS), None)
+
+    brand = next((BRAND_ALIASES.get(t, t) for t in tokens[:3] if t in BRANDS or t in BRAND_ALIASES), None)
+    if brand is None:
+        brand = next((LINE_BRANDS[t] for t in tokens if t in LINE_BRANDS), tokens[0] if tokens else '')
+
+    # Model names sit near the front of a title; later tokens are usually marketing copy
+    head = [t for t in tokens[:8]
+            if t != brand and t not in BRAND_ALIASES and t not in NOISE and t not in COLORS]
+    model = tuple(sorted({t for t in head if t in MODEL_WORDS or any(c.isdigit() for c in t)}))
+    if not any(any(c.isdigit() for c in t) for t in model):
+        # No model number (e.g. groceries): fall back to the leading words plus pack size
+        model = tuple(sorted(set(head[:5]) | set(sizes)))
+
+    return Signature(brand, model, int(storage) if storage else None, color, tuple(sizes))
+
+
+def build_blocks(products):
+    """Blocking index: only listings sharing brand and model tokens are ever compared"""
+    blocks = defaultdict(list)
+    for product in products:
+        sig = signature(product['title'])
+        blocks[(sig.brand, sig.model)].append((product, sig))
+    return blocks
+
+
+def group_products(products):
+    """Cluster listings of the same product across sources, cheapest cluster first"""
+    clusters = []
+    for (brand, model), members in build_blocks(products).items():
+        # Storage and size variants (43" vs 55" TV, 40mm vs 44mm watch) are different products
+        for storage, group in split_variants(members, 'storage', None).items():
+            for size, variant in split_sizes(group).items():
+                clusters.append(make_cluster(brand, model, storage, size, variant))
+
+    clusters.sort(key=lambda c: (c['best_price'] is None, c['best_price'] or 0))
+    return clusters
+
+
+def split_variants(members, field, unknown_value):
+    """Group (product, signature) pairs by a signature field.
+
+    Listings that do not state it join the only stated variant, if unambiguous.
+    """
+    variants = defaultdict(list)
+    for product, sig in members:
+        variants[getattr(sig, field)].append((product, sig))
+    unknown = variants.pop(unknown_value, [])
+    if unknown and len(variants) == 1:
+        next(iter(variants.values())).extend(unknown)
+    elif unknown:
+        variants[unknown_value] = unknown
+    return variants
+
+
+def split_sizes(members):
+    """Group by stated sizes; a listing stating fewer sizes (no screen size, say) joins the
+    one variant whose sizes include all of its own, if there is exactly one"""
+    variants = defaultdict(list)
+    for product, sig in members:
+        variants[sig.size].append((product, sig))
+    # Most specific first, so a listing stating nothing can follow one that already merged
+    for size in sorted(variants, key=len, reverse=True):
+        wider = [other for other in variants if other != size and set(size) < set(other)]
+        if len(wider) == 1:
+            variants[wider[0]].extend(variants.pop(size))
+    return variants
+
+
+def make_cluster(brand, model, storage, size, group):
+    listings = sorted((product for product, _ in group),
+                      key=lambda p: (p.get('price_num') is None, p.get('price_num') or 0))
+    best = listings[0]
+    parts = [brand, *model] + ([f'{storage}gb'] if storage else []) + [s for s in size if s not in model]
+    return {
+        'cluster_id': '-'.join(p for p in parts if p),
+        'title': min((p['title'] for p in listings), key=len),
+        'brand': brand,
+        'model': ' '.join(model),
+        'storage_gb': storage,
+        'size': list(size),
+        'colors': sorted({sig.color for _, sig in group if sig.color}),
+        'best_price': best.get('price_num'),
+        'best_source': best['source'],
+        'best_url': best['url'],
+        'sources': sorted({p['source'] for p in listings}),
+        'listings': listings
+    }
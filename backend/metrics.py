@@ -0,0 +1,192 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers fast HTTP parses through slow browser page loads
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def totals(self):
+        """JSON-safe values another process can add to its own, or None for gauges"""
+        return None
+
+    def render(self, others=()):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        lines += self.samples(others)
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def totals(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def samples(self, others=()):
+        with self._lock:
+            values = dict(self._values)
+        for totals in others:
+            for key, value in totals.get(self.name) or []:
+                values[tuple(key)] = values.get(tuple(key), 0) + value
+        items = sorted(values.items())
+        return [f'{self.name}{_label_text(self.labels, key)} {value}' for key, value in items]
+
+
+class Gauge(Metric):
+    """Gauge read from a callback at scrape time, e.g. the current queue depth"""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), read=None):
+        super().__init__(name, help_text, labels)
+        self.read = read
+
+    def samples(self, others=()):
+        try:
+            value = self.read() if self.read else {}
+        except Exception:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f'{self.name}{_label_text(self.labels, key if isinstance(key, tuple) else (key,))} {v}'
+                for key, v in sorted(value.items())]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts, sum, count]
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def totals(self):
+        with self._lock:
+            return [[list(key), [list(v[0]), v[1], v[2]]] for key, v in self._values.items()]
+
+    def samples(self, others=()):
+        with self._lock:
+            values = {key: (list(v[0]), v[1], v[2]) for key, v in self._values.items()}
+        for totals in others:
+            for key, (counts, total, count) in totals.get(self.name) or []:
+                mine = values.get(tuple(key), ([0] * len(self.buckets), 0.0, 0))
+                values[tuple(key)] = ([a + b for a, b in zip(mine[0], counts)], mine[1] + total, mine[2] + count)
+        items = sorted(values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_label_text(self.labels + ("le",), key + (bound,))} {n}')
+            lines.append(f'{self.name}_bucket{_label_text(self.labels + ("le",), key + ("+Inf",))} {count}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, key)} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def totals(self):
+        """Counter and histogram values by metric name, for another process to serve"""
+        return {metric.name: totals for metric in self._metrics if (totals := metric.totals()) is not None}
+
+    def render(self, others=()):
+        """Prometheus text exposition format; others are totals() of processes to add in"""
+        return '\n'.join(metric.render(others) for metric in self._metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+DRIVER_LAUNCH = REGISTRY.register(Histogram(
+    'shopsmart_driver_launch_seconds', 'Time to launch a Chrome driver'))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'shopsmart_stage_seconds', 'Time spent per scrape stage and site', ('site', 'stage')))
+PRODUCTS = REGISTRY.register(Counter(
+    'shopsmart_products_total', 'Extracted rows per site by outcome', ('site', 'outcome')))
+FIELD_MISSES = REGISTRY.register(Counter(
+    'shopsmart_field_misses_total', 'Rows where no selector for a field matched', ('site', 'field')))
+ERRORS = REGISTRY.register(Counter(
+    'shopsmart_errors_total', 'Exceptions caught and swallowed per site and stage', ('site', 'stage')))
+WEBDRIVER_COMMANDS = REGISTRY.register(Counter(
+    'shopsmart_webdriver_commands_total', 'WebDriver commands issued per site', ('site', 'command')))
+SITE_SKIPS = REGISTRY.register(Counter(
+    'shopsmart_site_skips_total', 'Site scrapes skipped because the site circuit breaker was open', ('site',)))
+JOB_SECONDS = REGISTRY.register(Histogram(
+    'shopsmart_job_seconds', 'Scrape job duration from start to finish', ('state',)))
+
+
+class CountingDriver:
+    """WebDriver proxy that counts each command issued for a site"""
+
+    def __init__(self, driver, site):
+        self.driver = driver
+        self.site = site
+
+    def __getattr__(self, name):
+        attr = getattr(self.driver, name)
+        if not callable(attr):
+            return attr
+
+        def command(*args, **kwargs):
+            WEBDRIVER_COMMANDS.inc(site=self.site, command=name)
+            return attr(*args, **kwargs)
+        return command
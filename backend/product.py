@@ -0,0 +1,89 @@
+import re
+import sys
+from operator import attrgetter
+
+NON_PRICE_CHARS = re.compile(r'[^\d.]')
+PRICE_DIGITS = re.compile(r'(\d+)')
+RATING = re.compile(r'\d+(?:\.\d+)?')
+
+FIELDS = ('title', 'price', 'price_num', 'mrp', 'discount_pct', 'rating', 'category',
+          'source', 'url', 'image', 'offers')
+
+
+def parse_price(price_text):
+    if not price_text:
+        return None
+    cleaned = NON_PRICE_CHARS.sub('', price_text)
+    match = PRICE_DIGITS.search(cleaned)
+    return int(match.group(1)) if match else None
+
+
+def parse_rating(rating_text):
+    """'4.5 out of 5 stars' -> 4.5; anything that is not a 0-5 star score -> None"""
+    if rating_text is None:
+        return None
+    match = RATING.search(str(rating_text))
+    if not match:
+        return None
+    value = float(match.group(0))
+    return value if value <= 5 else None
+
+
+class Product:
+    """One listing, parsed once: numbers are numbers, missing values are None.
+
+    Supports product['field'] and product.get('field') so code written against the old
+    dicts keeps working; to_dict() is the API shape.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, title, price, price_num, source, url, mrp=None, rating=None, category=None,
+                 image=None, offers=None):
+        self.title = title
+        self.price = price
+        self.price_num = price_num
+        self.mrp = mrp if mrp and price_num and mrp > price_num else None
+        self.discount_pct = round(100 * (self.mrp - price_num) / self.mrp) if self.mrp else None
+        self.rating = rating
+        # Few distinct values across thousands of listings; share one string each
+        self.category = sys.intern(category) if category else None
+        self.source = sys.intern(source)
+        self.url = url
+        self.image = image
+        self.offers = offers
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['title'], data.get('price'), data.get('price_num'), data['source'], data.get('url'),
+                   mrp=data.get('mrp'), rating=data.get('rating'), category=data.get('category'),
+                   image=data.get('image'), offers=data.get('offers'))
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def to_dict(self):
+        return dict(zip(FIELDS, _values(self)))
+
+    def size(self):
+        """Approximate bytes held: the slot array plus the per-listing strings"""
+        return 48 + 8 * len(FIELDS) + sum(len(text) for text in _texts(self) if text)
+
+    def __repr__(self):
+        return f'Product({self.source}: {self.title!r} @ {self.price_num})'
+
+
+_values = attrgetter(*FIELDS)
+_texts = attrgetter('title', 'price', 'url', 'image', 'offers')
+
+
+def to_json(obj):
+    """`default` hook for json.dumps so product lists serialize without a copy step"""
+    if isinstance(obj, Product):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
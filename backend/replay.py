@@ -0,0 +1,173 @@
+import os
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lxml import html
+
+from fetcher import parse_rows
+from sites import SITES
+
+FIXTURE_DIR = os.environ.get('FIXTURE_DIR', 'fixtures')
+
+# First line of every fixture records the live URL it was captured from
+URL_HEADER = re.compile(r'<!-- replay-url: (\S+) -->')
+SLUG = re.compile(r'[^a-z0-9]+')
+HEAD_TAG = re.compile(r'<head[^>]*>', re.I)
+
+
+def fixture_name(query):
+    return SLUG.sub('-', query.lower()).strip('-') or 'query'
+
+
+def fixture_path(site_key, query, fixture_dir=FIXTURE_DIR):
+    return os.path.join(fixture_dir, site_key, fixture_name(query) + '.html')
+
+
+def clean_page(page):
+    """Drop scripts and frames so a replayed page cannot re-render or navigate to the live site"""
+    root = html.fromstring(page)
+    for el in root.xpath('//script[not(@type="application/ld+json")] | //iframe | //noscript'):
+        el.drop_tree()
+    return html.tostring(root, encoding='unicode')
+
+
+def save_fixture(site_key, query, url, page, fixture_dir=FIXTURE_DIR):
+    path = fixture_path(site_key, query, fixture_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<!-- replay-url: {url} -->\n')
+        f.write(clean_page(page))
+    return path
+
+
+def read_fixture(path):
+    """Return (live_url, page) for a fixture file"""
+    with open(path, encoding='utf-8') as f:
+        header = f.readline()
+        page = f.read()
+    match = URL_HEADER.match(header)
+    return (match.group(1) if match else None), page
+
+
+def load_fixtures(fixture_dir=FIXTURE_DIR):
+    """Index every recorded fixture by the live search URL it replaces"""
+    fixtures = {}
+    for site_key in SITES:
+        directory = os.path.join(fixture_dir, site_key)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.html'):
+                continue
+            path = os.path.join(directory, name)
+            url, _ = read_fixture(path)
+            if url:
+                fixtures[url] = (site_key, path)
+    return fixtures
+
+
+def record(scraper, site_key, query, fixture_dir=FIXTURE_DIR):
+    """Load a live search page in scraper.driver, wait for products and snapshot the rendered DOM"""
+    site = SITES[site_key]
+    url = site.search_url(query)
+    scraper.driver.get(url)
+    if site.handle_popup:
+        scraper.handle_location_popup(timeout=5)
+    scraper.wait_for_products(site.name, site.containers, limit=site.limit,
+                              min_count=site.min_containers, **site.wait)
+    page = scraper.driver.execute_script("return document.documentElement.outerHTML;")
+    return save_fixture(site_key, query, url, page, fixture_dir)
+
+
+class ReplayFetcher:
+    """Drop-in for HttpFetcher that parses recorded fixtures instead of going to the network"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixtures = load_fixtures(fixture_dir)
+        self._pages = {}
+
+    def page_for(self, url):
+        if url not in self._pages:
+            self._pages[url] = read_fixture(self.fixtures[url][1])[1]
+        return self._pages[url]
+
+    def fetch_rows(self, site_key, url, limit=None):
+        if url not in self.fixtures:
+            return None
+        return parse_rows(site_key, self.page_for(url), url, limit) or None
+
+
+class FixtureServer:
+    """Serves recorded fixtures on localhost so a real browser can load them offline"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, port=0):
+        self.fixtures = load_fixtures(fixture_dir)
+        self._by_path = {}
+        for url, (site_key, path) in self.fixtures.items():
+            self._by_path[f'/{site_key}/{os.path.basename(path)}'] = (url, path)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    def _handler(self):
+        by_path = self._by_path
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                entry = by_path.get(self.path.split('?')[0])
+                if entry is None:
+                    self.send_error(404)
+                    return
+                url, path = entry
+                # <base> keeps relative product links resolving against the retailer, as live
+                body = HEAD_TAG.sub(lambda m: f'{m.group(0)}<base href="{url}">', read_fixture(path)[1], count=1)
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def routes(self):
+        """Map each live search URL to its local replay URL"""
+        return {url: f'http://127.0.0.1:{self.port}/{site_key}/{os.path.basename(path)}'
+                for url, (site_key, path) in self.fixtures.items()}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ReplayDriver:
+    """WebDriver proxy that counts commands and sends recorded search URLs to the fixture server"""
+
+    def __init__(self, driver, routes=None, calls=None):
+        self._driver = driver
+        self._routes = routes or {}
+        self.calls = calls if calls is not None else Counter()
+
+    def get(self, url):
+        self.calls['get'] += 1
+        return self._driver.get(self._routes.get(url, url))
+
+    def __getattr__(self, name):
+        attr = getattr(self._driver, name)
+        if not callable(attr):
+            return attr
+
+        def command(*args, **kwargs):
+            self.calls[name] += 1
+            return attr(*args, **kwargs)
+        return command
@@ -0,0 +1,94 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+SORTS = ('price_low', 'price_high', 'rating', 'discount')
+
+
+class ResultSet:
+    """Read indexes over one job's products, built once: price order plus source and category buckets.
+
+    A page is a walk along the chosen order from a cursor, skipping rows outside the
+    buckets, so a request touches about one page of rows instead of the whole list.
+    """
+
+    def __init__(self, products):
+        self.products = products
+        price_low = sorted(range(len(products)),
+                           key=lambda i: (products[i].price_num is None, products[i].price_num or 0))
+        self._orders = {'price_low': price_low}
+        # Unpriced products sort last in price_low; inf keeps the bisect below valid
+        self._prices = [float('inf') if products[i].price_num is None else products[i].price_num
+                        for i in price_low]
+        self.sources = defaultdict(set)
+        self.categories = defaultdict(set)
+        for i, product in enumerate(products):
+            self.sources[product.source].add(i)
+            self.categories[product.category].add(i)
+
+    def order(self, sort):
+        if sort not in self._orders:
+            price_low = self._orders['price_low']
+            rank = {i: r for r, i in enumerate(price_low)}
+            if sort == 'price_high':
+                self._orders[sort] = price_low[::-1]
+            elif sort == 'rating':
+                self._orders[sort] = sorted(price_low, key=lambda i: (-(self.products[i].rating or 0), rank[i]))
+            elif sort == 'discount':
+                self._orders[sort] = sorted(price_low, key=lambda i: (-(self.products[i].discount_pct or 0), rank[i]))
+            else:
+                raise ValueError(f'Unknown sort: {sort}')
+        return self._orders[sort]
+
+    def facets(self):
+        """Result counts per source and category, for filter menus"""
+        return {'sources': {source: len(ids) for source, ids in self.sources.items() if source},
+                'categories': {category: len(ids) for category, ids in self.categories.items() if category}}
+
+    def _allowed(self, sources, categories):
+        """Positions in every requested bucket, or None when there is no bucket filter"""
+        allowed = None
+        for buckets, wanted in ((self.sources, sources), (self.categories, categories)):
+            if wanted:
+                ids = set().union(*(buckets.get(value, set()) for value in wanted))
+                allowed = ids if allowed is None else allowed & ids
+        return allowed
+
+    def page(self, sort='price_low', cursor=0, limit=50, sources=None, categories=None,
+             min_price=None, max_price=None, min_rating=None):
+        """Returns (products, next_cursor); next_cursor is None once the order is exhausted"""
+        order = self.order(sort)
+        start, stop = cursor, len(order)
+
+        # Price orders: the price range is a contiguous run, found by bisection
+        price_bounded = sort in ('price_low', 'price_high')
+        if price_bounded:
+            low = bisect_left(self._prices, min_price) if min_price is not None else 0
+            if max_price is not None:
+                high = bisect_right(self._prices, max_price)
+            else:
+                # Any price bound excludes the unpriced tail
+                high = bisect_left(self._prices, float('inf')) if min_price is not None else len(order)
+            if sort == 'price_high':
+                low, high = len(order) - high, len(order) - low
+            start, stop = max(start, low), high
+
+        allowed = self._allowed(sources, categories)
+        if allowed is not None and not allowed:
+            return [], None
+
+        results = []
+        position = start
+        while position < stop and len(results) < limit:
+            product = self.products[order[position]]
+            position += 1
+            if allowed is not None and order[position - 1] not in allowed:
+                continue
+            if not price_bounded:
+                if min_price is not None and (product.price_num is None or product.price_num < min_price):
+                    continue
+                if max_price is not None and (product.price_num is None or product.price_num > max_price):
+                    continue
+            if min_rating is not None and (product.rating is None or product.rating < min_rating):
+                continue
+            results.append(product)
+        return results, (position if position < stop else None)
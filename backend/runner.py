@@ -0,0 +1,68 @@
+import os
+
+from driver_pool import DriverPool
+from fetcher import HttpFetcher
+from health import SiteHealth
+from scraper import UniversalEcommerceScraper, launch_driver, SITE_ORIGINS
+from sites import SITES
+
+
+class ScrapeRunner:
+    """Owns the browsers and runs scrape jobs; lives in the web process (thread mode) or a worker process"""
+
+    def __init__(self, price_store, selector_stats):
+        self.price_store = price_store
+        self.selector_stats = selector_stats
+        self.driver_pool = DriverPool(
+            launch_driver,
+            size=int(os.environ.get('DRIVER_POOL_SIZE', 5)),
+            max_uses=int(os.environ.get('DRIVER_MAX_USES', 20)),
+            max_memory_mb=int(os.environ.get('DRIVER_MAX_MEMORY_MB', 1500)),
+            reset_origins=SITE_ORIGINS
+        )
+        self.driver_pool.start_background()
+        self.http_fetcher = HttpFetcher()
+        self.health = SiteHealth(
+            threshold=int(os.environ.get('SITE_FAILURE_THRESHOLD', 3)),
+            cooldown=int(os.environ.get('SITE_COOLDOWN', 120)),
+            max_cooldown=int(os.environ.get('SITE_MAX_COOLDOWN', 1800))
+        )
+
+    def scrape(self, search_query, websites, on_site_result=None, deep=False):
+        scraper = UniversalEcommerceScraper(
+            debug_mode=False,
+            driver_pool=self.driver_pool,
+            parallel=True,
+            site_timeout=int(os.environ.get('SITE_TIMEOUT', 90)),
+            fetcher=self.http_fetcher,
+            on_site_result=on_site_result,
+            selector_stats=self.selector_stats,
+            deep=deep,
+            max_products=int(os.environ.get('DEEP_MAX_PRODUCTS', 100)),
+            time_budget=int(os.environ.get('DEEP_TIME_BUDGET', 60)),
+            max_pages=int(os.environ.get('DEEP_MAX_PAGES', 5)),
+            health=self.health
+        )
+        products = scraper.compare_prices(search_query, websites)
+        self.price_store.record_run(search_query, websites, products)
+        return products, scraper.ready_times, scraper.site_status
+
+    def run_job(self, job):
+        sites = [site for site in SITES if not job.websites or site in job.websites]
+        finished = []
+
+        def on_site_result(site, products, final):
+            # Pages stream to the client as they land; progress moves when a site is done
+            if products:
+                job.publish('site', {'site': site, 'products': products})
+            if final:
+                finished.append(site)
+                job.update(10 + 85 * len(finished) // max(len(sites), 1),
+                           f'Finished {SITES[site].name} ({len(finished)}/{len(sites)} sites)')
+
+        products, job.ready_times, job.site_status = self.scrape(job.query, job.websites, on_site_result, job.deep)
+        return products
+
+    def shutdown(self):
+        self.driver_pool.shutdown()
+        self.selector_stats.save()
@@ -3,57 +3,247 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import os
 import time
-import random
-import re
-from urllib.parse import quote_plus, quote
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from threading import Event, Lock, Timer
+
+from fetcher import BLOCK_MARKERS
+from matcher import categorize, matcher_for
+from product import Product, parse_price, parse_rating
+from metrics import DRIVER_LAUNCH, ERRORS, FIELD_MISSES, PRODUCTS, SITE_SKIPS, STAGE_SECONDS, CountingDriver
+from sites import SITES
+
+SITE_ORIGINS = [site.origin for site in SITES.values()]
+
+
+# undetected_chromedriver patches its binary on launch, so launches must not overlap
+_launch_lock = Lock()
+
+# Lean profile: eager page loads and no subresources the scraper never reads.
+# LEAN_BROWSER=0 loads full pages like a normal browser.
+LEAN_BROWSER = os.environ.get('LEAN_BROWSER', '1') != '0'
+
+# Network.setBlockedURLs patterns by resource kind; file types match with or without a query string
+BLOCKED_EXTENSIONS = {
+    'images': ['jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'svg', 'ico'],
+    'media': ['mp4', 'webm', 'm3u8', 'm4s', 'mp3'],
+    'fonts': ['woff', 'woff2', 'ttf', 'otf', 'eot']
+}
+BLOCKED_RESOURCES = {
+    **{kind: [pattern for ext in extensions for pattern in (f'*.{ext}', f'*.{ext}?*')]
+       for kind, extensions in BLOCKED_EXTENSIONS.items()},
+    'trackers': ['*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+                 '*googlesyndication.com*', '*amazon-adsystem.com*', '*facebook.net*',
+                 '*connect.facebook.com*', '*hotjar.com*', '*clarity.ms*', '*criteo.*',
+                 '*scorecardresearch.com*', '*branch.io*', '*clevertap*', '*moengage*',
+                 '*webengage*', '*newrelic.com*', '*nr-data.net*', '*sentry.io*']
+}
+
+LEAN_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-component-update",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--autoplay-policy=user-gesture-required"
+]
+
+
+def blocked_urls(site=None):
+    allowed = site.allow_resources if site else ()
+    return [pattern for kind, patterns in BLOCKED_RESOURCES.items() if kind not in allowed
+            for pattern in patterns]
+
+
+def launch_driver():
+    options = uc.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    
+    prefs = {
+        "profile.default_content_setting_values.geolocation": 1,  # Allow geolocation
+        "profile.default_content_settings.popups": 0,
+        "profile.default_content_setting_values.notifications": 2
+    }
+    options.add_experimental_option("prefs", prefs)
+    
+    if LEAN_BROWSER:
+        # driver.get returns at DOMContentLoaded; wait_for_products does the real waiting
+        options.page_load_strategy = 'eager'
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+    
+    with _launch_lock, DRIVER_LAUNCH.time():
+        driver = uc.Chrome(options=options)
+    
+    # Set geolocation to Mumbai coordinates for Croma
+    try:
+        driver.execute_cdp_cmd("Emulation.setGeolocationOverride", {
+            "latitude": 19.0760,
+            "longitude": 72.8777,
+            "accuracy": 100
+        })
+    except:
+        pass
+    
+    if LEAN_BROWSER:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls()})
+        except:
+            pass
+    
+    return driver
+
+# Runs in the page: finds the product containers, then resolves every field spec
+# (fallback selector chain, attributes to read, validation pattern) per container.
+# Also reports which container selector and which field selector matched, so the
+# chains can be reordered by hit rate.
+BATCH_EXTRACT_JS = """
+const [containerSelectors, minCount, containerXPath, limit, fields, offset = 0] = arguments;
+
+let containers = [];
+let containerIndex = null;
+for (let i = 0; i < containerSelectors.length; i++) {
+    const found = document.querySelectorAll(containerSelectors[i]);
+    if (found.length >= minCount) {
+        containers = Array.from(found);
+        containerIndex = i;
+        break;
+    }
+}
+if (!containers.length && containerXPath) {
+    const snapshot = document.evaluate(containerXPath, document, null,
+        XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        containers.push(snapshot.snapshotItem(i));
+    }
+}
+
+const read = (el, attr) => {
+    let value;
+    if (attr === 'text') value = el.innerText;
+    else if (attr === 'textContent') value = el.textContent;
+    else value = typeof el[attr] === 'string' ? el[attr] : el.getAttribute(attr);
+    return (value || '').trim();
+};
+
+// Lazy, so selectors after the first usable match are never queried
+function* candidates(container, spec) {
+    if (spec.closest) {
+        const parent = container.parentElement && container.parentElement.closest(spec.closest);
+        if (parent) yield [-1, [parent]];
+    }
+    const selectors = spec.selectors || [];
+    for (let i = 0; i < selectors.length; i++) {
+        if (selectors[i] === ':scope') yield [i, [container]];
+        else if (spec.all) yield [i, Array.from(container.querySelectorAll(selectors[i]))];
+        else {
+            const el = container.querySelector(selectors[i]);
+            if (el) yield [i, [el]];
+        }
+    }
+}
+
+const extract = (container, spec) => {
+    const pattern = spec.pattern ? new RegExp(spec.pattern, 'i') : null;
+    const minLength = spec.min_length || 0;
+    for (const [index, group] of candidates(container, spec)) {
+        for (const el of group) {
+            let value = '';
+            for (const attr of spec.attrs || ['text']) {
+                value = read(el, attr);
+                if (value) break;
+            }
+            if (value.length > minLength && (!pattern || pattern.test(value))) {
+                return {value: value, href: el.tagName === 'A' ? el.href : null, hit: index};
+            }
+        }
+    }
+    if (spec.fallback_pattern) {
+        const match = (container.innerText || '').match(new RegExp(spec.fallback_pattern));
+        if (match) return {value: match[0].trim(), href: null, hit: null};
+    }
+    return null;
+};
+
+const rows = [];
+const hits = [];
+for (const container of containers.slice(offset, offset + limit)) {
+    const row = {};
+    const rowHits = {};
+    for (const [name, spec] of Object.entries(fields)) {
+        const result = extract(container, spec);
+        row[name] = result ? result.value : null;
+        rowHits[name] = result ? result.hit : null;
+        if (spec.href) row[name + '_href'] = result ? result.href : null;
+    }
+    rows.push(row);
+    hits.push(rowHits);
+}
+return {container: containerIndex, rows: rows, hits: hits};
+"""
 
 class UniversalEcommerceScraper:
-    def __init__(self, debug_mode=False):
+    def __init__(self, debug_mode=False, driver_pool=None, parallel=False, site_timeout=90, fetcher=None,
+                 on_site_result=None, selector_stats=None, deep=False, max_products=100, time_budget=60,
+                 max_pages=5, health=None):
         self.driver = None
         self.debug_mode = debug_mode
+        self.driver_pool = driver_pool
+        self.fetcher = fetcher
+        self.selector_stats = selector_stats
+        # Called with (site_key, products) as soon as each site finishes
+        self.on_site_result = on_site_result
+        self.parallel = parallel
+        self.site_timeout = site_timeout
+        # Deep mode follows further pages (or keeps scrolling) until a product or time budget per site
+        self.deep = deep
+        self.max_products = max_products
+        self.time_budget = time_budget
+        self.max_pages = max_pages
+        # Per-site circuit breakers; sites whose breaker is open are skipped
+        self.health = health
+        self.ready_times = {}
+        # How each site's scrape ended: 'ok', 'skipped', or the failure reason
+        self.site_status = {}
+        self.failures = {}
+        # Sites that got past the browser queue, and sites whose outcome is already recorded
+        self.reached = set()
+        self._finished = set()
+        self._finish_lock = Lock()
     
     def debug_print(self, message):
         if self.debug_mode:
             print(f"  [DEBUG] {message}")
 
     def create_driver(self):
-        options = uc.ChromeOptions()
-        options.add_argument("--headless=new")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        prefs = {
-            "profile.default_content_setting_values.geolocation": 1,  # Allow geolocation
-            "profile.default_content_settings.popups": 0,
-            "profile.default_content_setting_values.notifications": 2
-        }
-        options.add_experimental_option("prefs", prefs)
-        
-        self.driver = uc.Chrome(options=options)
-        
-        # Set geolocation to Mumbai coordinates for Croma
-        try:
-            self.driver.execute_cdp_cmd("Emulation.setGeolocationOverride", {
-                "latitude": 19.0760,
-                "longitude": 72.8777,
-                "accuracy": 100
-            })
-        except:
-            pass
-        
+        self.driver = launch_driver()
         return self.driver
 
+    def block_resources(self, site):
+        """Apply the site's block list; pooled browsers move between sites, so it is set every time"""
+        try:
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls(site)})
+        except Exception as e:
+            self.debug_print(f"Could not set blocked URLs: {str(e)[:50]}")
+
     def handle_location_popup(self, timeout=5):
         """Handle location permission popup by clicking 'Allow this time' or similar buttons"""
         try:
             wait = WebDriverWait(self.driver, timeout)
             
-            # Try multiple possible button texts and selectors
+            # Try multiple possible button texts and selectors in a single wait
             location_button_selectors = [
                 "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'allow this time')]",
                 "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'allow')]",
@@ -62,18 +252,10 @@ class UniversalEcommerceScraper:
                 "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'allow')]"
             ]
             
-            for selector in location_button_selectors:
-                try:
-                    button = wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                    button.click()
-                    self.debug_print("✅ Clicked location permission button")
-                    time.sleep(2)
-                    return True
-                except:
-                    continue
-            
-            self.debug_print("No location popup found or already handled")
-            return False
+            button = wait.until(EC.element_to_be_clickable((By.XPATH, " | ".join(location_button_selectors))))
+            button.click()
+            self.debug_print("✅ Clicked location permission button")
+            return True
             
         except TimeoutException:
             self.debug_print("No location popup appeared")
@@ -82,714 +264,480 @@ class UniversalEcommerceScraper:
             self.debug_print(f"Error handling location popup: {str(e)[:50]}")
             return False
 
-    def extract_price(self, price_text):
-        if not price_text or price_text == "N/A":
-            return None
-        cleaned = re.sub(r'[^\d.]', '', price_text)
-        match = re.search(r'(\d+)', cleaned)
-        return int(match.group(1)) if match else None
+    def count_containers(self, container_selectors, min_count=1):
+        """Count matches of the first selector that finds at least min_count elements"""
+        return self.driver.execute_script("""
+            for (const selector of arguments[0]) {
+                const count = document.querySelectorAll(selector).length;
+                if (count >= arguments[1]) return count;
+            }
+            return 0;
+        """, container_selectors, min_count)
 
-    def is_relevant_product(self, title, query):
-        if not title or len(title) < 3:
+    def page_blocked(self):
+        """True when the loaded page is a captcha or bot wall rather than search results"""
+        try:
+            text = self.driver.execute_script(
+                "return document.title + ' ' + (document.body ? document.body.innerText.slice(0, 5000) : '');")
+        except Exception:
             return False
+        return bool(text and BLOCK_MARKERS.search(text))
+
+    def wait_for_products(self, site, container_selectors, limit, timeout=15,
+                          scroll_step=800, settle_timeout=2, max_scrolls=6, min_count=1):
+        """Wait for product containers, then scroll until their count stops growing or reaches limit"""
+        started = time.time()
+        try:
+            count = WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(
+                lambda d: self.count_containers(container_selectors, min_count))
+        except TimeoutException:
+            self.ready_times[site] = time.time() - started
+            self.debug_print(f"{site}: no product containers after {timeout}s")
+            return 0
         
-        title_lower = title.lower()
-        query_lower = query.lower()
+        count = self.scroll_for_more(container_selectors, count, limit, min_count=min_count,
+                                     scroll_step=scroll_step, settle_timeout=settle_timeout,
+                                     max_scrolls=max_scrolls)
         
-        # Filter accessories
-        accessory_keywords = ['cover', 'case', 'protector', 'charger', 'cable', 'adapter', 
-                             'earphone', 'headphone', 'stand', 'holder', 'skin', 'bumper']
-        if any(acc in title_lower for acc in accessory_keywords):
-            return False
+        self.ready_times[site] = time.time() - started
+        self.debug_print(f"{site}: ready in {self.ready_times[site]:.1f}s with {count} containers")
+        return count
+
+    def scroll_for_more(self, container_selectors, count, limit, min_count=1,
+                        scroll_step=800, settle_timeout=2, max_scrolls=6, **_):
+        """Scroll until the container count reaches limit or stops growing; returns the new count"""
+        for _ in range(max_scrolls):
+            if count >= limit:
+                break
+            self.driver.execute_script(f"window.scrollBy(0, {scroll_step});")
+            previous = count
+            try:
+                count = WebDriverWait(self.driver, settle_timeout, poll_frequency=0.25).until(
+                    lambda d: (n := self.count_containers(container_selectors, min_count)) > previous and n)
+            except TimeoutException:
+                break
+        return count
+
+    def extraction_plan(self, site):
+        """Extractor arguments, with selector chains in learned hit-rate order when stats are kept"""
+        plan = self.selector_stats.plan(site) if self.selector_stats else list(site.extract_args)
+        plan[3] = self.page_limit(site)
+        return plan
+
+    def page_limit(self, site):
+        return self.max_products if self.deep else site.limit
+
+    def extract_batch(self, site, plan=None, offset=0):
+        """Extract every field of the site's containers with a single in-page script call"""
+        plan = plan or self.extraction_plan(site)
+        result = self.driver.execute_script(BATCH_EXTRACT_JS, *plan, offset) or {}
+        if self.selector_stats:
+            self.selector_stats.record_batch(site.key, plan, result)
+        return result.get('rows') or []
+
+    def extract_price(self, price_text):
+        return parse_price(price_text)
+
+    def is_relevant_product(self, title, query):
+        return matcher_for(query).is_relevant(title)
+
+    def auto_categorize_product(self, title):
+        return categorize(title)
+
+    def scrape_site_http(self, site_key, search_query, page=1):
+        """Fast path for server-rendered sites; returns None when the browser is needed"""
+        site = SITES[site_key]
+        if not (self.fetcher and site.http_first):
+            return None
+        
+        url = site.search_url(search_query, page)
+        started = time.time()
+        with STAGE_SECONDS.time(site=site_key, stage='http'):
+            rows = self.fetcher.fetch_rows(site_key, url, self.page_limit(site))
+        if not rows:
+            self.debug_print(f"{site.name}: HTTP page {page} blocked or empty")
+            return None
         
-        # iPhone model matching
-        if 'iphone' in query_lower:
-            query_model = re.search(r'iphone\s*(\d+)', query_lower)
-            title_model = re.search(r'iphone\s*(\d+)', title_lower)
-            if query_model and title_model:
-                return query_model.group(1) == title_model.group(1)
+        if page == 1:
+            self.ready_times[site.name] = time.time() - started
+        products = self.build_products(site, rows, url, search_query)
         
-        # General matching
-        query_words = [w for w in query_lower.split() if len(w) > 2]
-        if not query_words:
-            return False
-        match_count = sum(1 for word in query_words if word in title_lower)
-        return match_count >= len(query_words) / 2
+        print(f"  ⚡ Found {len(products)} products on {site.name} (HTTP, page {page})")
+        return products
 
-    def auto_categorize_product(self, title):
-        title_lower = title.lower()
-        categories = {
-            'Mobile Phones': ['phone', 'mobile', 'iphone', 'samsung', 'oneplus', 'pixel'],
-            'Laptops': ['laptop', 'notebook', 'macbook', 'chromebook'],
-            'Television': ['tv', 'television', 'smart tv'],
-            'Groceries': ['rice', 'wheat', 'oil', 'dal', 'sugar', 'tea', 'coffee'],
-            'Home Appliances': ['mixer', 'grinder', 'cooker', 'refrigerator', 'washing machine']
-        }
-        for category, keywords in categories.items():
-            if any(kw in title_lower for kw in keywords):
-                return category
-        return "General Products"
+    def http_pages(self, site_key, search_query):
+        """Pages served over HTTP, or None when even the first page needs the browser"""
+        first = self.scrape_site_http(site_key, search_query)
+        if first is None:
+            return None
+        
+        def pages():
+            yield first
+            if not SITES[site_key].page_url_template:
+                return
+            for page in range(2, self.max_pages + 1):
+                products = self.scrape_site_http(site_key, search_query, page)
+                if not products:
+                    return
+                yield products
+        return pages()
 
-    def scrape_flipkart(self, search_query):
-        print("  📱 Loading Flipkart...")
-        url = f"https://www.flipkart.com/search?q={quote_plus(search_query)}"
+    def browser_pages(self, site, search_query):
+        """Load the site's search page in the browser, then yield each page of normalized products"""
+        print(f"  {site.icon} Loading {site.name}...")
+        url = site.search_url(search_query)
+        driver = self.driver
+        self.driver = CountingDriver(driver, site.key)
         try:
-            self.driver.get(url)
-            time.sleep(5)
-            
-            # Scroll to load content
-            for _ in range(3):
-                self.driver.execute_script("window.scrollBy(0, 1000);")
-                time.sleep(1.5)
-            
-            products = []
-            containers = self.driver.find_elements(By.CSS_SELECTOR, "div[data-id], div._1AtVbE, div.tUxRFH")
-            
-            for container in containers[:15]:
-                try:
-                    # Title
-                    title = ""
-                    for sel in ["a.wjcEIp", "a.WKTcLC", "div.KzDlHZ", "a.IRpwTa"]:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            title = elem.text.strip() or elem.get_attribute('title') or ""
-                            if title and len(title) > 5:
-                                break
-                        except:
-                            continue
-                    
-                    if not title or not self.is_relevant_product(title, search_query):
-                        continue
-                    
-                    # Price
-                    price_text = "N/A"
-                    for sel in ["div.Nx9bqj", "div._30jeq3", "div._3I9_wc"]:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            price_text = elem.text.strip()
-                            if price_text and re.search(r'\d{2,}', price_text):
-                                break
-                        except:
-                            continue
-                    
-                    if price_text == "N/A":
-                        continue
-                    
-                    # URL
-                    product_url = url
-                    try:
-                        link = container.find_element(By.CSS_SELECTOR, "a[href]")
-                        href = link.get_attribute('href')
-                        if href and ('/p/' in href or '/dp/' in href):
-                            product_url = href if href.startswith('http') else f"https://www.flipkart.com{href}"
-                    except:
-                        pass
-                    
-                    # Rating
-                    rating = "N/A"
-                    for sel in ["span.Wphh3N", "div.XQDdHH", "div._3LWZlK"]:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            rating = elem.text.strip()
-                            if rating:
-                                break
-                        except:
-                            continue
-                    
-                    # Image
-                    image_url = "N/A"
-                    try:
-                        img = container.find_element(By.CSS_SELECTOR, "img")
-                        src = img.get_attribute('src') or img.get_attribute('data-src') or ""
-                        if src and 'placeholder' not in src.lower():
-                            image_url = src
-                    except:
-                        pass
-                    
-                    products.append({
-                        'title': title,
-                        'price': price_text,
-                        'price_num': self.extract_price(price_text),
-                        'rating': rating,
-                        'category': self.auto_categorize_product(title),
-                        'source': 'Flipkart',
-                        'url': product_url,
-                        'image': image_url,
-                        'offers': 'N/A'
-                    })
-                    
-                except Exception as e:
-                    self.debug_print(f"Error: {str(e)[:50]}")
-                    continue
-            
-            print(f"  ✅ Found {len(products)} products on Flipkart")
-            return products
+            if LEAN_BROWSER:
+                self.block_resources(site)
+            with STAGE_SECONDS.time(site=site.key, stage='navigate'):
+                self.driver.get(url)
+            
+            # A bot wall will never show products; do not sit through the wait and scrolls
+            if self.page_blocked():
+                self.site_failed(site, 'blocked')
+                return
+            
+            if site.handle_popup:
+                with STAGE_SECONDS.time(site=site.key, stage='popup'):
+                    self.handle_location_popup(timeout=5)
+            
+            plan = self.extraction_plan(site)
+            limit = plan[3]
+            with STAGE_SECONDS.time(site=site.key, stage='wait'):
+                count = self.wait_for_products(site.name, plan[0], limit=limit,
+                                               min_count=site.min_containers, **site.wait)
+            
+            with STAGE_SECONDS.time(site=site.key, stage='extract'):
+                rows = self.extract_batch(site, plan)
+            if not rows:
+                # Late-rendered captcha, or a layout the selectors no longer match
+                self.site_failed(site, 'blocked' if self.page_blocked() else 'empty')
+                return
+            products = self.build_products(site, rows, url, search_query)
+            print(f"  ✅ Found {len(products)} products on {site.name}")
+            yield products
+            
+            # Deep mode only: numbered result pages where the site has them, else keep scrolling
+            offset = len(rows)
+            for page in range(2, self.max_pages + 1):
+                if site.page_url_template:
+                    url = site.search_url(search_query, page)
+                    with STAGE_SECONDS.time(site=site.key, stage='navigate'):
+                        self.driver.get(url)
+                    ready = self.ready_times.get(site.name)
+                    with STAGE_SECONDS.time(site=site.key, stage='wait'):
+                        count = self.wait_for_products(site.name, plan[0], limit=limit,
+                                                       min_count=site.min_containers, **site.wait)
+                    # Time-to-ready describes the first page
+                    self.ready_times[site.name] = ready
+                    offset = 0
+                else:
+                    with STAGE_SECONDS.time(site=site.key, stage='wait'):
+                        count = self.scroll_for_more(plan[0], count, count + limit,
+                                                     min_count=site.min_containers, **site.wait)
+                if count <= offset:
+                    return
+                
+                with STAGE_SECONDS.time(site=site.key, stage='extract'):
+                    rows = self.extract_batch(site, plan, offset)
+                if not rows:
+                    return
+                offset += len(rows)
+                products = self.build_products(site, rows, url, search_query)
+                print(f"  ➕ Found {len(products)} more products on {site.name} (page {page})")
+                yield products
         except Exception as e:
-            print(f"  ❌ Error scraping Flipkart: {str(e)}")
-            return []
+            ERRORS.inc(site=site.key, stage='scrape')
+            self.failures[site.key] = 'error'
+            print(f"  ❌ Error scraping {site.name}: {str(e)}")
+        finally:
+            self.driver = driver
 
-    def scrape_amazon(self, search_query):
-        print("  🛒 Loading Amazon...")
-        url = f"https://www.amazon.in/s?k={quote_plus(search_query)}"
+    def site_failed(self, site, reason):
+        ERRORS.inc(site=site.key, stage=reason)
+        self.failures[site.key] = reason
+        print(f"  🚧 {site.name}: {'blocked by a captcha or bot wall' if reason == 'blocked' else 'no products on the page'}")
+
+    def within_budget(self, pages):
+        """Drop products already seen on earlier pages and stop once the budget is spent.
+
+        Without deep mode only the first page is taken.
+        """
+        started = time.time()
+        seen = set()
+        total = 0
         try:
-            self.driver.get(url)
-            time.sleep(6)
-            
-            for _ in range(3):
-                self.driver.execute_script("window.scrollBy(0, 800);")
-                time.sleep(1.5)
-            
-            products = []
-            containers = self.driver.find_elements(By.CSS_SELECTOR, "[data-component-type='s-search-result']")
-            
-            for container in containers[:15]:
-                try:
-                    # ASIN and URL
-                    asin = container.get_attribute('data-asin')
-                    if not asin or len(asin) != 10:
-                        continue
-                    product_url = f"https://www.amazon.in/dp/{asin}"
-                    
-                    # Title
-                    title = ""
-                    for sel in ["h2 a span", "h2 span", ".a-size-medium"]:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            title = elem.text.strip()
-                            if title and len(title) > 5:
-                                break
-                        except:
-                            continue
-                    
-                    if not title or not self.is_relevant_product(title, search_query):
-                        continue
-                    
-                    # Price
-                    price_text = "N/A"
-                    for sel in [".a-price-whole", ".a-price .a-offscreen"]:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            price_text = elem.text.strip() or elem.get_attribute("textContent").strip()
-                            if price_text and re.search(r'\d', price_text):
-                                break
-                        except:
-                            continue
-                    
-                    if price_text == "N/A":
-                        continue
-                    
-                    # Rating
-                    rating = "N/A"
-                    try:
-                        elem = container.find_element(By.CSS_SELECTOR, ".a-icon-alt")
-                        rating = elem.get_attribute("title") or elem.text
-                    except:
-                        pass
-                    
-                    # Image
-                    image_url = "N/A"
-                    try:
-                        img = container.find_element(By.CSS_SELECTOR, "img.s-image")
-                        src = img.get_attribute('src') or ""
-                        if src and len(src) > 20:
-                            image_url = src
-                    except:
-                        pass
-                    
-                    products.append({
-                        'title': title,
-                        'price': price_text,
-                        'price_num': self.extract_price(price_text),
-                        'rating': rating,
-                        'category': self.auto_categorize_product(title),
-                        'source': 'Amazon',
-                        'url': product_url,
-                        'image': image_url,
-                        'offers': 'N/A'
-                    })
-                    
-                except Exception as e:
-                    self.debug_print(f"Error: {str(e)[:50]}")
-                    continue
-            
-            print(f"  ✅ Found {len(products)} products on Amazon")
-            return products
-        except Exception as e:
-            print(f"  ❌ Error scraping Amazon: {str(e)}")
-            return []
+            for products in pages:
+                fresh = []
+                for product in products:
+                    key = (product.url, product.title)
+                    if key not in seen:
+                        seen.add(key)
+                        fresh.append(product)
+                if self.deep:
+                    fresh = fresh[:self.max_products - total]
+                total += len(fresh)
+                if fresh:
+                    yield fresh
+                if (not self.deep or not fresh or total >= self.max_products
+                        or time.time() - started > self.time_budget):
+                    break
+        finally:
+            pages.close()
+
+    def iter_pages(self, site_key, search_query, try_http=True):
+        """Yield a site's products one page at a time, so callers can use the first page early"""
+        pages = self.http_pages(site_key, search_query) if try_http else None
+        if pages is None:
+            pages = self.browser_pages(SITES[site_key], search_query)
+        return self.within_budget(pages)
+
+    def iter_products(self, site_key, search_query):
+        for products in self.iter_pages(site_key, search_query):
+            yield from products
+
+    def scrape_site(self, site_key, search_query, try_http=True):
+        """Shared scrape engine: every page of one site as a single list"""
+        return [product for products in self.iter_pages(site_key, search_query, try_http)
+                for product in products]
+
+    def build_products(self, site, rows, search_url, search_query):
+        """Normalize a page of extracted rows: drop incomplete and irrelevant ones, categorize the rest"""
+        for field in site.fields:
+            missing = sum(1 for row in rows if not row.get(field))
+            if missing:
+                FIELD_MISSES.inc(missing, site=site.key, field=field)
+        
+        complete = [row for row in rows if all(row.get(field) for field in site.required)]
+        is_relevant = matcher_for(search_query).is_relevant
+        kept = [row for row in complete if is_relevant(row['title'])]
+        PRODUCTS.inc(len(rows) - len(complete), site=site.key, outcome='incomplete')
+        PRODUCTS.inc(len(complete) - len(kept), site=site.key, outcome='filtered')
+        PRODUCTS.inc(len(kept), site=site.key, outcome='kept')
+        
+        products = []
+        for row in kept:
+            products.append(Product(
+                row['title'],
+                row['price'],
+                parse_price(row['price']),
+                site.name,
+                site.product_url(row, search_url),
+                mrp=parse_price(row.get('mrp')),
+                rating=parse_rating(row.get('rating')),
+                category=categorize(row['title']),
+                image=site.image_url(row)
+            ))
+        return products
+
+    def scrape_flipkart(self, search_query):
+        yield from self.iter_products('flipkart', search_query)
+
+    def scrape_amazon(self, search_query):
+        yield from self.iter_products('amazon', search_query)
 
     def scrape_vijay_sales(self, search_query):
-        print("  🏬 Loading Vijay Sales...")
-        search_url = f"https://www.vijaysales.com/search-listing?q={quote_plus(search_query)}"
-        try:
-            self.driver.get(search_url)
-            time.sleep(random.uniform(4, 6))
-            
-            # Scroll to load products
-            for i in range(4):
-                self.driver.execute_script("window.scrollBy(0, 800);")
-                time.sleep(2)
-            
-            # Multiple container selectors
-            container_selectors = [
-                ".product-card", ".product-item", ".item",
-                ".product-container", "[class*='product']",
-                ".grid-item", ".catalog-product-item", ".product-tile"
-            ]
-            
-            containers = []
-            for selector in container_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if len(elements) >= 2:
-                        containers = elements
-                        self.debug_print(f"Found {len(elements)} containers with: {selector}")
-                        break
-                except:
-                    continue
-            
-            products = []
-            
-            for container in containers[:15]:
-                try:
-                    title = ""
-                    product_url = None
-                    
-                    # Extract title and URL
-                    for selector in ["a.product-name", "a.product-title", "a.item-name",
-                                     "a[href*='/p/']", ".name a", ".title a", "h2 a", "h3 a", "h4 a"]:
-                        try:
-                            link_elem = container.find_element(By.CSS_SELECTOR, selector)
-                            title = link_elem.text.strip() or link_elem.get_attribute('title') or ""
-                            if title and len(title) > 3:
-                                href = link_elem.get_attribute('href')
-                                if href:
-                                    product_url = href if href.startswith('http') else f"https://www.vijaysales.com{href}"
-                                break
-                        except:
-                            continue
-                    
-                    # Fallback: Extract title from non-link elements
-                    if not title:
-                        for selector in [".product-name", ".product-title", ".name", ".title", "h2", "h3", "h4"]:
-                            try:
-                                title_elem = container.find_element(By.CSS_SELECTOR, selector)
-                                title = title_elem.text.strip()
-                                if title and len(title) > 3:
-                                    break
-                            except:
-                                continue
-                    
-                    # Fallback: Extract URL if not found
-                    if not product_url:
-                        try:
-                            all_links = container.find_elements(By.TAG_NAME, "a")
-                            for link in all_links:
-                                href = link.get_attribute('href')
-                                if href and ('/p/' in href or 'product' in href.lower()):
-                                    product_url = href if href.startswith('http') else f"https://www.vijaysales.com{href}"
-                                    break
-                        except:
-                            pass
-                    
-                    if not product_url:
-                        product_url = search_url
-                    
-                    # Validate title
-                    if not title or len(title) < 3:
-                        continue
-                    
-                    if not self.is_relevant_product(title, search_query):
-                        continue
-                    
-                    # Extract price
-                    price_text = "N/A"
-                    for selector in [".price", ".final-price", ".current-price",
-                                     ".selling-price", ".offer-price", "[class*='price']"]:
-                        try:
-                            price_elem = container.find_element(By.CSS_SELECTOR, selector)
-                            price_text = price_elem.text.strip()
-                            if price_text and ('₹' in price_text or re.search(r'\d{2,}', price_text)):
-                                break
-                        except:
-                            continue
-                    
-                    # Fallback: Extract price from container text
-                    if price_text == "N/A":
-                        try:
-                            container_text = container.text
-                            price_match = re.search(r'₹\s*[\d,]+', container_text)
-                            if price_match:
-                                price_text = price_match.group().strip()
-                        except:
-                            pass
-                    
-                    if price_text == "N/A":
-                        continue
-                    
-                    # Extract rating
-                    rating = "N/A"
-                    try:
-                        rating_elem = container.find_element(By.CSS_SELECTOR, ".rating, .star-rating, [class*='rating']")
-                        rating = rating_elem.text.strip()
-                    except:
-                        pass
-                    
-                    # Auto-categorize
-                    category = self.auto_categorize_product(title)
-                    
-                    # Extract image
-                    image_url = "N/A"
-                    try:
-                        img_elem = container.find_element(By.CSS_SELECTOR, "img")
-                        image_url = img_elem.get_attribute('src') or "N/A"
-                        if image_url != "N/A" and image_url.startswith('/'):
-                            image_url = f"https://www.vijaysales.com{image_url}"
-                    except:
-                        pass
-                    
-                    products.append({
-                        'title': title,
-                        'price': price_text,
-                        'price_num': self.extract_price(price_text),
-                        'rating': rating,
-                        'category': category,
-                        'source': 'Vijay Sales',
-                        'url': product_url,
-                        'image': image_url,
-                        'offers': 'N/A'
-                    })
-                    
-                except Exception as e:
-                    self.debug_print(f"Error processing container: {str(e)[:50]}")
-                    continue
-            
-            print(f"  ✅ Found {len(products)} products on Vijay Sales")
-            return products
-            
-        except Exception as e:
-            print(f"  ❌ Error scraping Vijay Sales: {str(e)}")
-            return []
+        yield from self.iter_products('vijay_sales', search_query)
 
     def scrape_jiomart(self, search_query):
-        print("  🔵 Loading JioMart...")
-        url = f"https://www.jiomart.com/search/{quote(search_query)}"
-        try:
-            self.driver.get(url)
-            time.sleep(8)  # Longer wait for JioMart
-            
-            # Aggressive scrolling to load products
-            for i in range(6):
-                self.driver.execute_script("window.scrollBy(0, 800);")
-                time.sleep(2)
-            
-            products = []
-            
-            # Multiple container strategies
-            container_selectors = [
-                "div.plp-card-container",
-                "div[data-test='product-card']",
-                "div.product-card",
-                "article.product",
-                "div[class*='plp-card']",
-                "div[class*='product']"
-            ]
-            
-            containers = []
-            for selector in container_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if len(elements) >= 2:
-                        containers = elements
-                        self.debug_print(f"Found {len(elements)} containers with: {selector}")
-                        break
-                except:
-                    continue
-            
-            # Fallback: Find divs with images and price-like text
-            if not containers:
-                try:
-                    containers = self.driver.find_elements(By.XPATH,
-                        "//div[.//img and (.//span[contains(text(), '₹')] or .//span[contains(@class, 'price')])]")
-                    self.debug_print(f"Found {len(containers)} containers using fallback")
-                except:
-                    pass
-            
-            for idx, container in enumerate(containers[:20]):
-                try:
-                    # Title - Multiple strategies
-                    title = ""
-                    title_selectors = [
-                        "div.plp-card-details-name",
-                        "div.jm-body-xs",
-                        "h3",
-                        "h2",
-                        "a[title]",
-                        "div[class*='name']",
-                        "div[class*='title']"
-                    ]
-                    
-                    for sel in title_selectors:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            title = elem.text.strip() or elem.get_attribute('title') or ""
-                            if title and len(title) > 5:
-                                break
-                        except:
-                            continue
-                    
-                    if not title or not self.is_relevant_product(title, search_query):
-                        continue
-                    
-                    # Price - Multiple strategies
-                    price_text = "N/A"
-                    price_selectors = [
-                        "span.jm-heading-xxs",
-                        "span.jm-heading-xs",
-                        "span[class*='price']",
-                        "div[class*='price']",
-                        "span[class*='amount']"
-                    ]
-                    
-                    for sel in price_selectors:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            price_text = elem.text.strip()
-                            if price_text and re.search(r'\d', price_text):
-                                break
-                        except:
-                            continue
-                    
-                    if price_text == "N/A":
-                        continue
-                    
-                    # URL - Multiple strategies
-                    product_url = url
-                    
-                    # Strategy 1: Find parent anchor
-                    try:
-                        parent_link = container.find_element(By.XPATH, "./ancestor::a[1]")
-                        href = parent_link.get_attribute("href")
-                        if href and '/p/' in href:
-                            product_url = href if href.startswith('http') else f"https://www.jiomart.com{href}"
-                    except:
-                        pass
-                    
-                    # Strategy 2: Find any anchor inside
-                    if product_url == url:
-                        try:
-                            links = container.find_elements(By.TAG_NAME, "a")
-                            for link in links:
-                                href = link.get_attribute("href")
-                                if href and '/p/' in href:
-                                    product_url = href if href.startswith('http') else f"https://www.jiomart.com{href}"
-                                    break
-                        except:
-                            pass
-                    
-                    # Image
-                    image_url = "N/A"
-                    try:
-                        img = container.find_element(By.CSS_SELECTOR, "img")
-                        src = img.get_attribute("src") or img.get_attribute("data-src") or ""
-                        if src and len(src) > 20:
-                            image_url = src
-                    except:
-                        pass
-                    
-                    products.append({
-                        'title': title,
-                        'price': price_text,
-                        'price_num': self.extract_price(price_text),
-                        'rating': 'N/A',
-                        'category': self.auto_categorize_product(title),
-                        'source': 'JioMart',
-                        'url': product_url,
-                        'image': image_url,
-                        'offers': 'N/A'
-                    })
-                    
-                except Exception as e:
-                    self.debug_print(f"Error in container {idx+1}: {str(e)[:50]}")
-                    continue
-            
-            print(f"  ✅ Found {len(products)} products on JioMart")
-            return products
-        except Exception as e:
-            print(f"  ❌ Error scraping JioMart: {str(e)}")
-            return []
+        yield from self.iter_products('jiomart', search_query)
 
     def scrape_croma(self, search_query):
-        print("  🟠 Loading Croma...")
-        url = f"https://www.croma.com/searchB?q={quote_plus(search_query)}%3Arelevance&text={quote_plus(search_query)}"
-        try:
-            self.driver.get(url)
-            time.sleep(3)
-            
-            # CRITICAL: Handle location permission popup
-            self.handle_location_popup(timeout=5)
-            
-            # Additional wait after handling popup
-            time.sleep(3)
-            
-            # Scroll to load products
-            for i in range(5):
-                self.driver.execute_script("window.scrollBy(0, 1000);")
-                time.sleep(2)
-            
-            products = []
-            
-            # Multiple container strategies
-            container_selectors = [
-                "li.product-item",
-                "div.product-item",
-                "article.product",
-                "div[class*='product-item']",
-                "li[class*='product']"
-            ]
-            
-            containers = []
-            for selector in container_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if len(elements) >= 2:
-                        containers = elements
-                        self.debug_print(f"Found {len(elements)} containers with: {selector}")
-                        break
-                except:
-                    continue
-            
-            for idx, container in enumerate(containers[:20]):
-                try:
-                    # Title and URL
-                    title = ""
-                    product_url = url
-                    
-                    title_selectors = [
-                        "h3.product-title a",
-                        "a.product-title",
-                        "h3 a",
-                        ".product-title",
-                        "a[href*='/p/']"
-                    ]
-                    
-                    for sel in title_selectors:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            title = elem.text.strip() or elem.get_attribute('title') or ""
-                            if title and len(title) > 5:
-                                if elem.tag_name == 'a':
-                                    href = elem.get_attribute('href')
-                                    if href and href != url:
-                                        product_url = href if href.startswith('http') else f"https://www.croma.com{href}"
-                                break
-                        except:
-                            continue
-                    
-                    if not title or not self.is_relevant_product(title, search_query):
-                        continue
-                    
-                    # Price
-                    price_text = "N/A"
-                    price_selectors = [
-                        "span.amount",
-                        "span.price",
-                        "div.price",
-                        "span.plp-srp-new-amount",
-                        "span.new-price",
-                        "span[class*='amount']",
-                        "span[class*='price']"
-                    ]
-                    
-                    for sel in price_selectors:
-                        try:
-                            elem = container.find_element(By.CSS_SELECTOR, sel)
-                            price_text = elem.text.strip()
-                            if price_text and re.search(r'\d{3,}', price_text):
-                                break
-                        except:
-                            continue
-                    
-                    if price_text == "N/A":
-                        continue
-                    
-                    # Rating
-                    rating = "N/A"
-                    try:
-                        elem = container.find_element(By.CSS_SELECTOR, ".rating, [class*='rating'], [class*='star']")
-                        rating = elem.get_attribute('title') or elem.text.strip()
-                    except:
-                        pass
-                    
-                    # Image
-                    image_url = "N/A"
-                    try:
-                        img = container.find_element(By.CSS_SELECTOR, "img")
-                        src = img.get_attribute('src') or img.get_attribute('data-src') or ""
-                        if src and len(src) > 20:
-                            image_url = src if src.startswith('http') else f"https://www.croma.com{src}"
-                    except:
-                        pass
-                    
-                    products.append({
-                        'title': title,
-                        'price': price_text,
-                        'price_num': self.extract_price(price_text),
-                        'rating': rating,
-                        'category': self.auto_categorize_product(title),
-                        'source': 'Croma',
-                        'url': product_url,
-                        'image': image_url,
-                        'offers': 'N/A'
-                    })
-                    
-                except Exception as e:
-                    self.debug_print(f"Error in container {idx+1}: {str(e)[:50]}")
-                    continue
-            
-            print(f"  ✅ Found {len(products)} products on Croma")
-            return products
-        except Exception as e:
-            print(f"  ❌ Error scraping Croma: {str(e)}")
-            return []
+        yield from self.iter_products('croma', search_query)
 
     def compare_prices(self, search_query, websites=None):
         print(f"\n🔍 UNIVERSAL PRICE COMPARISON - 5 WEBSITES")
         print(f"Searching for: '{search_query}'")
         print("=" * 70)
         
-        all_products = []
-        self.create_driver()
-        
         if websites is None:
-            websites = ['flipkart', 'amazon', 'vijay_sales', 'jiomart', 'croma']
+            websites = list(SITES)
         
+        if self.parallel:
+            all_products = self.run_scrapers_parallel(search_query, websites)
+        elif self.driver_pool:
+            with self.driver_pool.lease() as driver:
+                self.driver = driver
+                try:
+                    all_products = self.run_scrapers(search_query, websites)
+                finally:
+                    self.driver = None
+        else:
+            self.create_driver()
+            try:
+                all_products = self.run_scrapers(search_query, websites)
+            finally:
+                if self.driver:
+                    try:
+                        print("\n👋 Closing browser...")
+                        self.driver.quit()
+                    except:
+                        pass
+        
+        valid_products = [p for p in all_products if self.is_valid_product(p)]
+        valid_products.sort(key=attrgetter('price_num'))
+        return valid_products
+
+    def is_valid_product(self, product):
+        return bool(product.price_num and product.price_num >= 10)
+
+    def report_site(self, site, products, final=True):
+        """Hand products to the on_site_result callback; final marks the site as finished"""
+        if self.on_site_result:
+            try:
+                self.on_site_result(site, [p for p in products if self.is_valid_product(p)], final)
+            except Exception as e:
+                self.debug_print(f"Site result callback failed: {str(e)[:50]}")
+
+    def collect(self, site, pages):
+        """Report each page as it arrives and return all of them"""
+        all_products = []
+        for products in pages:
+            self.report_site(site, products, final=False)
+            all_products += products
+        return all_products
+
+    def site_allowed(self, site):
+        if self.health and not self.health.allow(site):
+            SITE_SKIPS.inc(site=site)
+            self.site_status[site] = 'skipped'
+            print(f"  🚫 Skipping {SITES[site].name}: failing recently, circuit open")
+            return False
+        return True
+
+    def finish_site(self, site, failure=None, reached=True):
+        """Record a site's outcome once; breakers only hear about scrapes that reached the site"""
+        with self._finish_lock:
+            if site in self._finished:
+                return
+            self._finished.add(site)
+        self.site_status[site] = failure or 'ok'
+        if self.health and reached:
+            self.health.record(site, failure)
+
+    def run_scrapers(self, search_query, websites):
+        all_products = []
         try:
-            if 'flipkart' in websites:
-                all_products += self.scrape_flipkart(search_query)
-            
-            if 'amazon' in websites:
-                all_products += self.scrape_amazon(search_query)
-            
-            if 'vijay_sales' in websites:
-                all_products += self.scrape_vijay_sales(search_query)
-            
-            if 'jiomart' in websites:
-                all_products += self.scrape_jiomart(search_query)
-            
-            if 'croma' in websites:
-                all_products += self.scrape_croma(search_query)
-                
+            for site in SITES:
+                if site in websites:
+                    if self.site_allowed(site):
+                        all_products += self.collect(site, self.iter_pages(site, search_query))
+                        self.finish_site(site, self.failures.get(site))
+                    self.report_site(site, [])
         except KeyboardInterrupt:
             print("\n⚠️ Scraping interrupted by user")
-        finally:
-            if self.driver:
+        return all_products
+
+    def site_deadline(self):
+        return self.site_timeout + (self.time_budget if self.deep else 0)
+
+    def run_scrapers_parallel(self, search_query, websites):
+        """Scrape each site on its own browser and merge whatever finishes in time"""
+        sites = [site for site in SITES if site in websites]
+        if not sites:
+            return []
+        
+        # Sites beyond the pool size queue for a browser, so allow one timeout per wave
+        capacity = self.driver_pool.size if self.driver_pool else len(sites)
+        waves = -(-len(sites) // capacity)
+        overall_timeout = self.site_deadline() * waves + 60
+        
+        executor = ThreadPoolExecutor(max_workers=len(sites))
+        futures = {executor.submit(self.scrape_site_isolated, site, search_query): site for site in sites}
+        
+        all_products = []
+        finished = set()
+        try:
+            for future in as_completed(futures, timeout=overall_timeout):
+                finished.add(future)
                 try:
-                    print("\n👋 Closing browser...")
-                    self.driver.quit()
+                    products = future.result()
+                except Exception as e:
+                    ERRORS.inc(site=futures[future], stage='worker')
+                    print(f"  ❌ Error scraping {futures[future]}: {str(e)}")
+                    # A browser pool problem (no free browser in time) is not the site's fault
+                    self.finish_site(futures[future], 'error', reached=futures[future] in self.reached)
+                    products = []
+                # Pages were already reported by the worker as they arrived
+                self.report_site(futures[future], [])
+                all_products += products
+        except FuturesTimeoutError:
+            for future in futures:
+                if future not in finished:
+                    ERRORS.inc(site=futures[future], stage='timeout')
+                    print(f"  ⏱️ {futures[future]} did not finish in time, skipping")
+                    self.finish_site(futures[future], 'timeout', reached=futures[future] in self.reached)
+        executor.shutdown(wait=False, cancel_futures=True)
+        return all_products
+
+    def scrape_site_isolated(self, site, search_query):
+        if not self.site_allowed(site):
+            return []
+        worker = UniversalEcommerceScraper(debug_mode=self.debug_mode, site_timeout=self.site_timeout,
+                                           fetcher=self.fetcher, selector_stats=self.selector_stats,
+                                           deep=self.deep, max_products=self.max_products,
+                                           time_budget=self.time_budget, max_pages=self.max_pages)
+        
+        # Only lease a browser when the HTTP fast path cannot serve the site
+        pages = worker.http_pages(site, search_query)
+        if pages is not None:
+            self.reached.add(site)
+            try:
+                products = self.collect(site, worker.within_budget(pages))
+            finally:
+                self.ready_times.update(worker.ready_times)
+            self.finish_site(site)
+            return products
+        
+        if self.driver_pool:
+            with self.driver_pool.lease() as driver:
+                self.reached.add(site)
+                worker.driver = driver
+                try:
+                    products = self.run_with_watchdog(worker, site, search_query)
+                finally:
+                    self.ready_times.update(worker.ready_times)
+        else:
+            worker.create_driver()
+            self.reached.add(site)
+            try:
+                products = self.run_with_watchdog(worker, site, search_query)
+            finally:
+                self.ready_times.update(worker.ready_times)
+                try:
+                    worker.driver.quit()
                 except:
                     pass
+        self.finish_site(site, worker.failures.get(site))
+        return products
+
+    def run_with_watchdog(self, worker, site, search_query):
+        timed_out = Event()
+        # The raw driver: worker.driver is wrapped for command counting while scraping
+        driver = worker.driver
         
-        valid_products = [p for p in all_products if p['price_num'] and p['price_num'] >= 10]
-        valid_products.sort(key=lambda x: x['price_num'])
-        return valid_products
+        def expire():
+            # Killing the browser makes the blocked WebDriver call fail fast
+            timed_out.set()
+            if self.driver_pool:
+                self.driver_pool.discard(driver)
+            try:
+                driver.quit()
+            except:
+                pass
+        
+        timer = Timer(self.site_deadline(), expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            products = self.collect(site, worker.iter_pages(site, search_query, try_http=False))
+        finally:
+            timer.cancel()
+        
+        if timed_out.is_set():
+            worker.failures[site] = 'timeout'
+            ERRORS.inc(site=site, stage='watchdog')
+            print(f"  ⏱️ {site} timed out after {self.site_deadline()}s")
+        return products
@@ -0,0 +1,213 @@
+import json
+import os
+import re
+import threading
+import time
+import heapq
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+
+from cache import normalize_query
+from product import Product, parse_rating
+from storage import product_key
+
+TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+class ProductIndex:
+    """Inverted index over scraped products (title token -> product ids) for instant search.
+
+    Bounded to max_products: the product seen longest ago is evicted first. The last query
+    token matches as a prefix, so results follow the user's typing.
+    """
+
+    def __init__(self, path=None, max_products=20000, max_queries=2000, save_interval=300):
+        self.path = path
+        self.max_products = max_products
+        self.max_queries = max_queries
+        self.save_interval = save_interval
+        self._docs = OrderedDict()  # id -> (product, last seen, title token count), least recently seen first
+        self._ids = {}
+        self._postings = defaultdict(set)
+        self._vocab = []
+        self._vocab_dirty = False
+        self._queries = Counter()
+        self._next_id = 0
+        self._lock = threading.RLock()
+        self._saved_at = time.time()
+        self.load()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, products, seen=None):
+        """Index (or refresh) products; the same listing seen again replaces its old entry"""
+        seen = seen or time.time()
+        with self._lock:
+            for product in products:
+                key = (product.source, product_key(product))
+                doc_id = self._ids.get(key)
+                if doc_id is not None:
+                    old, _, length = self._docs[doc_id]
+                    if old.title != product.title:
+                        self._unpost(doc_id, old.title)
+                        length = self._post(doc_id, product.title)
+                    self._docs[doc_id] = (product, seen, length)
+                    self._docs.move_to_end(doc_id)
+                    continue
+                doc_id = self._next_id
+                self._next_id += 1
+                self._ids[key] = doc_id
+                self._docs[doc_id] = (product, seen, self._post(doc_id, product.title))
+
+            while len(self._docs) > self.max_products:
+                doc_id, (product, _, _) = self._docs.popitem(last=False)
+                del self._ids[(product.source, product_key(product))]
+                self._unpost(doc_id, product.title)
+        self._autosave()
+
+    def seed(self, rows):
+        """Build from stored observations (dicts with observed_at), e.g. on first start.
+
+        Rows come most recently seen first; they are added oldest first so eviction order holds.
+        """
+        for row in sorted(rows, key=lambda row: row['observed_at']):
+            self.add([Product.from_dict(dict(row, rating=parse_rating(row.get('rating'))))], row['observed_at'])
+
+    def note_query(self, query):
+        query = normalize_query(query)
+        if not query:
+            return
+        with self._lock:
+            self._queries[query] += 1
+            if len(self._queries) > self.max_queries * 1.25:
+                self._queries = Counter(dict(self._queries.most_common(self.max_queries)))
+
+    def _post(self, doc_id, title):
+        """Add the title's tokens; returns how many there are, for ranking"""
+        tokens = tokenize(title)
+        for token in set(tokens):
+            if token not in self._postings:
+                self._vocab_dirty = True
+            self._postings[token].add(doc_id)
+        return len(tokens)
+
+    def _unpost(self, doc_id, title):
+        for token in set(tokenize(title)):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(doc_id)
+            if not ids:
+                del self._postings[token]
+                self._vocab_dirty = True
+
+    def _expand(self, prefix):
+        """Every indexed token starting with prefix"""
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        tokens = []
+        for token in self._vocab[bisect_left(self._vocab, prefix):]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def search(self, query, limit=20):
+        """Products whose titles contain every query token (the last one as a prefix)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # A trailing space means the last word is complete
+        exact, last = (tokens, None) if query.endswith(' ') else (tokens[:-1], tokens[-1])
+        with self._lock:
+            sets = [self._postings.get(token, set()) for token in exact]
+            if last is not None:
+                sets.append(set().union(*(self._postings[t] for t in self._expand(last))))
+            sets.sort(key=len)
+            ids = set(sets[0]).intersection(*sets[1:]) if sets[0] else set()
+            docs = [(doc_id, self._docs[doc_id]) for doc_id in ids]
+
+        # Titles made mostly of the query words first, then cheapest
+        def rank(doc):
+            doc_id, (product, _, length) = doc
+            return (-len(tokens) / max(length, 1), product.price_num or 0, doc_id)
+
+        return [product for _, (product, _, _) in heapq.nsmallest(limit, docs, key=rank)]
+
+    def suggest(self, prefix, limit=8):
+        """Past searches starting with prefix, then completions of its last word from indexed titles"""
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            suggestions = [q for q, _ in self._queries.most_common() if q.startswith(prefix) and q != prefix][:limit]
+            head, _, last = prefix.rpartition(' ')
+            completions = sorted(self._expand(last), key=lambda t: -len(self._postings[t]))
+        for token in completions:
+            if len(suggestions) >= limit:
+                break
+            text = f'{head} {token}' if head else token
+            if text != prefix and text not in suggestions:
+                suggestions.append(text)
+        return suggestions
+
+    def stats(self):
+        with self._lock:
+            return {'products': len(self._docs), 'tokens': len(self._postings), 'queries': len(self._queries),
+                    'max_products': self.max_products}
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load product index: {e}")
+            return
+        with self._lock:
+            for doc_id, seen, length, fields in data['docs']:
+                product = Product.from_dict(fields)
+                self._docs[doc_id] = (product, seen, length)
+                self._ids[(product.source, product_key(product))] = doc_id
+            # Postings are stored too, so a restart does not re-tokenize every title
+            self._postings = defaultdict(set, {token: set(ids) for token, ids in data['postings'].items()})
+            self._vocab_dirty = True
+            self._queries = Counter(data.get('queries', {}))
+            self._next_id = data['next_id']
+        print(f"📇 Loaded product index: {len(self._docs)} products, {len(self._postings)} tokens")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                'next_id': self._next_id,
+                'docs': [[doc_id, seen, length, product.to_dict()]
+                         for doc_id, (product, seen, length) in self._docs.items()],
+                'postings': {token: sorted(ids) for token, ids in self._postings.items()},
+                'queries': dict(self._queries)
+            }
+            self._saved_at = time.time()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Several web processes may save the same index
+        temp = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp, self.path)
+
+    def _autosave(self):
+        if time.time() - self._saved_at <= self.save_interval:
+            return
+        try:
+            self.save()
+        except OSError as e:
+            print(f"⚠️ Could not save product index: {e}")
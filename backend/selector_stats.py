@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves still never corrupt the file, but may drop another process's counts
+    fcntl = None
+
+CONTAINERS = 'containers'
+# Per-field lookup total, stored next to the selectors; never a valid selector
+LOOKUPS = ''
+
+
+class SelectorStats:
+    """Per site and field hit counts for each selector, used to try the likeliest selector first.
+
+    Only chains marked `reorder` (alternatives that extract the same value, e.g. class names
+    from different markup versions) are reordered; `reorder` may also be a count, to reorder only
+    that many leading selectors ahead of a fixed generic tail. Most chains run from specific to
+    generic, or their first match decides a side value like the title href, so their order is fixed.
+    Selectors are ranked by their share of all lookups on the field; a fallback is only tried
+    after the earlier selectors missed, so its own hit rate is not comparable.
+    """
+
+    def __init__(self, path=None, min_attempts=20, max_attempts=500, save_interval=60):
+        self.path = path
+        self.min_attempts = min_attempts
+        # Counts are halved past this so a markup change is picked up within a few hundred rows
+        self.max_attempts = max_attempts
+        self.save_interval = save_interval
+        self._counts = {}
+        # Counts recorded since the last save; several worker processes share the file, so a
+        # save adds these to what is on disk instead of overwriting it
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._saved_at = time.time()
+        self.load()
+
+    def _read(self):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        return {tuple(key.partition('/')[::2]): {sel: list(counts) for sel, counts in selectors.items()}
+                for key, selectors in data.items()}
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            counts = self._read()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load selector stats: {e}")
+            return
+        with self._lock:
+            self._counts = counts
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(f'{self.path}.lock', 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                merged = self._read() if os.path.exists(self.path) else {}
+            except ValueError:
+                merged = {}
+            for key, selectors in self._pending.items():
+                counts = merged.setdefault(key, {})
+                for selector, (hits, attempts) in selectors.items():
+                    entry = counts.setdefault(selector, [0, 0])
+                    entry[0] += hits
+                    entry[1] += attempts
+                self._decay(counts)
+            data = {f'{site}/{field}': selectors for (site, field), selectors in merged.items()}
+            temp = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1)
+            os.replace(temp, self.path)
+            # Pick up what the other processes learned too
+            self._counts = merged
+            self._pending = {}
+            self._saved_at = time.time()
+
+    def _decay(self, counts):
+        if any(attempts > self.max_attempts for _, attempts in counts.values()):
+            for entry in counts.values():
+                entry[0] //= 2
+                entry[1] //= 2
+
+    def order(self, site_key, field, selectors):
+        counts = self._counts.get((site_key, field), {})
+        if counts.get(LOOKUPS, (0, 0))[1] < self.min_attempts:
+            return list(selectors)
+
+        def rank(item):
+            index, selector = item
+            hits, attempts = counts.get(selector, (0, 0))
+            if hits == 0 and attempts >= self.min_attempts:
+                return (1, 0, index)
+            # Same denominator for every selector in the chain, so ranking by hits is ranking by share
+            return (0, -hits, index)
+
+        return [selector for _, selector in sorted(enumerate(selectors), key=rank)]
+
+    def plan(self, site):
+        """In-page extractor arguments for a site, with interchangeable selector chains in learned order.
+
+        Container chains keep their configured order: each ends in a catch-all that would match
+        wrapper elements once promoted, and would never give the specific selectors a try again.
+        """
+        fields = {}
+        for name, spec in site.fields.items():
+            selectors = spec.get('selectors') or []
+            reorder = spec.get('reorder')
+            # True reorders the whole chain, a number only that many leading selectors
+            count = len(selectors) if reorder is True else int(reorder or 0)
+            if count > 1 and not spec.get('href'):
+                selectors = self.order(site.key, name, selectors[:count]) + selectors[count:]
+                spec = dict(spec, selectors=selectors)
+            fields[name] = spec
+        return [site.containers, site.min_containers, site.container_xpath, site.limit, fields]
+
+    def record(self, site_key, field, selectors, matches):
+        """Count one lookup per entry of matches: the index that matched, or None when all missed"""
+        with self._lock:
+            for totals in (self._counts, self._pending):
+                counts = totals.setdefault((site_key, field), {})
+                counts.setdefault(LOOKUPS, [0, 0])[1] += sum(matches.values())
+                for index, n in matches.items():
+                    tried = selectors if index is None else selectors[:index + 1]
+                    for selector in tried:
+                        entry = counts.setdefault(selector, [0, 0])
+                        entry[1] += n
+                    if index is not None:
+                        counts[selectors[index]][0] += n
+            self._decay(self._counts[(site_key, field)])
+            due = time.time() - self._saved_at > self.save_interval
+
+        if due:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"⚠️ Could not save selector stats: {e}")
+
+    def record_batch(self, site_key, plan, result):
+        """Record the container probe and every field lookup reported by one extractor run"""
+        containers, fields = plan[0], plan[4]
+        # An empty page (blocked, no results) says nothing about the container selectors
+        if result.get('container') is not None or result.get('rows'):
+            self.record(site_key, CONTAINERS, containers, {result.get('container'): 1})
+
+        by_field = {}
+        for hits in result.get('hits') or []:
+            for field, index in hits.items():
+                # -1: resolved through `closest`, which is not part of the chain
+                if index != -1 and field in fields:
+                    by_field.setdefault(field, Counter())[index] += 1
+        for field, matches in by_field.items():
+            self.record(site_key, field, fields[field].get('selectors') or [], matches)
+
+    def snapshot(self):
+        with self._lock:
+            return {f'{site}/{field}': {sel: {'hits': hits, 'attempts': attempts}
+                                        for sel, (hits, attempts) in selectors.items() if sel != LOOKUPS}
+                    for (site, field), selectors in self._counts.items()}
@@ -0,0 +1,195 @@
+from urllib.parse import quote_plus, quote
+
+
+class SiteConfig:
+    """Declarative description of one retailer: search URL, wait strategy and field selector chains"""
+
+    def __init__(self, key, name, icon, origin, search_url, containers, fields,
+                 limit=15, min_containers=1, container_xpath=None, wait=None,
+                 required=('title', 'price'), url_fields=('url',), product_url=None,
+                 image_base=None, image_reject=(), handle_popup=False, http_first=False,
+                 cache_ttl=600, allow_resources=(), page_url=None):
+        self.key = key
+        self.name = name
+        self.icon = icon
+        self.origin = origin
+        self.search_url_template = search_url
+        # Numbered result pages for deep mode; without one, deep mode keeps scrolling instead
+        self.page_url_template = page_url
+        self.containers = containers
+        self.fields = fields
+        self.limit = limit
+        self.min_containers = min_containers
+        self.container_xpath = container_xpath
+        self.wait = wait or {}
+        self.required = required
+        self.url_fields = url_fields
+        self.product_url_template = product_url
+        self.image_base = image_base
+        self.image_reject = image_reject
+        self.handle_popup = handle_popup
+        # Listing is server-rendered, so a plain HTTP fetch is tried before the browser
+        self.http_first = http_first
+        # Seconds a scraped result set for this site is served from cache before refreshing
+        self.cache_ttl = cache_ttl
+        # Resource kinds the lean browser profile must still load here (e.g. 'images' for lazy images)
+        self.allow_resources = allow_resources
+
+        # Selector plan handed to the in-page extractor, built once at import
+        self.extract_args = [containers, min_containers, container_xpath, limit, fields]
+
+    def search_url(self, search_query, page=1):
+        template = self.page_url_template if page > 1 and self.page_url_template else self.search_url_template
+        return template.format(q=quote_plus(search_query), path=quote(search_query), page=page)
+
+    def product_url(self, row, search_url):
+        if self.product_url_template and all(row.get(field) for field in self.required):
+            return self.product_url_template.format(**row)
+        # 'url' comes last so rows parsed from embedded JSON still resolve
+        for field in (*self.url_fields, 'url'):
+            href = row.get(field)
+            if href and href != search_url:
+                return href if href.startswith('http') else f"{self.origin}{href}"
+        return search_url
+
+    def image_url(self, row):
+        src = row.get('image')
+        if not src or any(word in src.lower() for word in self.image_reject):
+            return None
+        if self.image_base and not src.startswith('http'):
+            return f"{self.image_base}{src}"
+        return src
+
+
+SITES = {site.key: site for site in [
+    SiteConfig(
+        key='flipkart',
+        name='Flipkart',
+        icon='📱',
+        origin='https://www.flipkart.com',
+        search_url='https://www.flipkart.com/search?q={q}',
+        page_url='https://www.flipkart.com/search?q={q}&page={page}',
+        containers=["div[data-id], div._1AtVbE, div.tUxRFH"],
+        wait={'scroll_step': 1000, 'max_scrolls': 3},
+        fields={
+            # Class names from successive markup versions, so learned stats may reorder them
+            'title': {'selectors': ["a.wjcEIp", "a.WKTcLC", "div.KzDlHZ", "a.IRpwTa"],
+                      'attrs': ['text', 'title'], 'min_length': 5, 'reorder': True},
+            'price': {'selectors': ["div.Nx9bqj", "div._30jeq3", "div._3I9_wc"], 'pattern': r'\d{2,}',
+                      'reorder': True},
+            'mrp': {'selectors': ["div.yRaY8j"], 'pattern': r'\d{2,}'},
+            'url': {'selectors': ["a[href]"], 'attrs': ['href'], 'pattern': r'/p/|/dp/'},
+            'rating': {'selectors': ["span.Wphh3N", "div.XQDdHH", "div._3LWZlK"], 'reorder': True},
+            'image': {'selectors': ["img"], 'attrs': ['src', 'data-src']}
+        },
+        image_reject=('placeholder',),
+        http_first=True
+    ),
+    SiteConfig(
+        key='amazon',
+        name='Amazon',
+        icon='🛒',
+        origin='https://www.amazon.in',
+        search_url='https://www.amazon.in/s?k={q}',
+        page_url='https://www.amazon.in/s?k={q}&page={page}',
+        containers=["[data-component-type='s-search-result']"],
+        wait={'max_scrolls': 3},
+        fields={
+            'asin': {'selectors': [":scope"], 'attrs': ['data-asin'], 'pattern': r'^\w{10}$'},
+            'title': {'selectors': ["h2 a span", "h2 span", ".a-size-medium"], 'min_length': 5},
+            'price': {'selectors': [".a-price-whole", ".a-price .a-offscreen"],
+                      'attrs': ['text', 'textContent'], 'pattern': r'\d'},
+            'mrp': {'selectors': [".a-price.a-text-price .a-offscreen"], 'attrs': ['textContent'], 'pattern': r'\d'},
+            'rating': {'selectors': [".a-icon-alt"], 'attrs': ['title', 'text', 'textContent']},
+            'image': {'selectors': ["img.s-image"], 'attrs': ['src'], 'min_length': 20}
+        },
+        required=('asin', 'title', 'price'),
+        product_url='https://www.amazon.in/dp/{asin}',
+        http_first=True,
+        cache_ttl=300
+    ),
+    SiteConfig(
+        key='vijay_sales',
+        name='Vijay Sales',
+        icon='🏬',
+        origin='https://www.vijaysales.com',
+        search_url='https://www.vijaysales.com/search-listing?q={q}',
+        containers=[".product-card", ".product-item", ".item",
+                    ".product-container", "[class*='product']",
+                    ".grid-item", ".catalog-product-item", ".product-tile"],
+        min_containers=2,
+        wait={'max_scrolls': 4},
+        fields={
+            # Title links first, then plain title elements as a fallback
+            'title': {'selectors': ["a.product-name", "a.product-title", "a.item-name",
+                                    "a[href*='/p/']", ".name a", ".title a", "h2 a", "h3 a", "h4 a",
+                                    ".product-name", ".product-title", ".name", ".title", "h2", "h3", "h4"],
+                      'attrs': ['text', 'title'], 'min_length': 3, 'href': True},
+            'link': {'selectors': ["a"], 'attrs': ['href'], 'all': True, 'pattern': r'/p/|product'},
+            'price': {'selectors': [".price", ".final-price", ".current-price",
+                                    ".selling-price", ".offer-price", "[class*='price']"],
+                      'pattern': r'₹|\d{2,}', 'fallback_pattern': r'₹\s*[\d,]+'},
+            'rating': {'selectors': [".rating, .star-rating, [class*='rating']"]},
+            'image': {'selectors': ["img"], 'attrs': ['src']}
+        },
+        url_fields=('title_href', 'link'),
+        image_base='https://www.vijaysales.com'
+    ),
+    SiteConfig(
+        key='jiomart',
+        name='JioMart',
+        icon='🔵',
+        origin='https://www.jiomart.com',
+        search_url='https://www.jiomart.com/search/{path}',
+        containers=["div.plp-card-container", "div[data-test='product-card']", "div.product-card",
+                    "article.product", "div[class*='plp-card']", "div[class*='product']"],
+        min_containers=2,
+        # Fallback: divs with images and price-like text
+        container_xpath="//div[.//img and (.//span[contains(text(), '₹')] or .//span[contains(@class, 'price')])]",
+        limit=20,
+        # JioMart renders slowly, so allow a longer initial wait
+        wait={'timeout': 20, 'max_scrolls': 6},
+        fields={
+            'title': {'selectors': ["div.plp-card-details-name", "div.jm-body-xs", "h3", "h2",
+                                    "a[title]", "div[class*='name']", "div[class*='title']"],
+                      'attrs': ['text', 'title'], 'min_length': 5},
+            'price': {'selectors': ["span.jm-heading-xxs", "span.jm-heading-xs", "span[class*='price']",
+                                    "div[class*='price']", "span[class*='amount']"],
+                      'pattern': r'\d'},
+            # Parent anchor first, then any product anchor inside the card
+            'url': {'closest': "a", 'selectors': ["a"], 'attrs': ['href'], 'all': True, 'pattern': r'/p/'},
+            'image': {'selectors': ["img"], 'attrs': ['src', 'data-src'], 'min_length': 20}
+        },
+        # Grocery prices move slowly
+        cache_ttl=1800
+    ),
+    SiteConfig(
+        key='croma',
+        name='Croma',
+        icon='🟠',
+        origin='https://www.croma.com',
+        search_url='https://www.croma.com/searchB?q={q}%3Arelevance&text={q}',
+        containers=["li.product-item", "div.product-item", "article.product",
+                    "div[class*='product-item']", "li[class*='product']"],
+        min_containers=2,
+        limit=20,
+        wait={'scroll_step': 1000, 'max_scrolls': 5},
+        fields={
+            'title': {'selectors': ["h3.product-title a", "a.product-title", "h3 a",
+                                    ".product-title", "a[href*='/p/']"],
+                      'attrs': ['text', 'title'], 'min_length': 5, 'href': True},
+            # The five specific classes are interchangeable; the partial-class matches stay last
+            'price': {'selectors': ["span.amount", "span.price", "div.price", "span.plp-srp-new-amount",
+                                    "span.new-price", "span[class*='amount']", "span[class*='price']"],
+                      'pattern': r'\d{3,}', 'reorder': 5},
+            'rating': {'selectors': [".rating, [class*='rating'], [class*='star']"], 'attrs': ['title', 'text']},
+            'image': {'selectors': ["img"], 'attrs': ['src', 'data-src'], 'min_length': 20}
+        },
+        url_fields=('title_href',),
+        image_base='https://www.croma.com',
+        # CRITICAL: Croma asks for location permission before listing products
+        handle_popup=True,
+        # Product images only get their real src once the placeholder image has loaded
+        allow_resources=('images',)
+    )
+]}
@@ -0,0 +1,375 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+ASIN = re.compile(r'/dp/(\w{10})')
+SEARCH_PAGE = re.compile(r'/search|searchB|search-listing')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    query TEXT NOT NULL,
+    websites TEXT,
+    created_at REAL NOT NULL,
+    product_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    source TEXT NOT NULL,
+    product_key TEXT NOT NULL,
+    observed_at REAL NOT NULL,
+    run_id INTEGER NOT NULL,
+    title TEXT,
+    price TEXT,
+    price_num INTEGER,
+    rating TEXT,
+    category TEXT,
+    url TEXT,
+    image TEXT,
+    PRIMARY KEY (source, product_key, observed_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_observations_run ON observations (run_id);
+CREATE INDEX IF NOT EXISTS idx_observations_time ON observations (observed_at);
+-- When each listing was last scraped; observations only record price changes
+CREATE TABLE IF NOT EXISTS listings (
+    source TEXT NOT NULL,
+    product_key TEXT NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (source, product_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_listings_last_seen ON listings (last_seen);
+CREATE TABLE IF NOT EXISTS watches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query TEXT NOT NULL,
+    websites TEXT NOT NULL DEFAULT '',
+    interval REAL NOT NULL,
+    next_run REAL NOT NULL,
+    last_run REAL,
+    created_at REAL NOT NULL,
+    UNIQUE (query, websites)
+);
+CREATE INDEX IF NOT EXISTS idx_watches_next_run ON watches (next_run);
+CREATE TABLE IF NOT EXISTS watch_items (
+    watch_id INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    product_key TEXT NOT NULL,
+    price_num INTEGER,
+    available INTEGER NOT NULL,
+    PRIMARY KEY (watch_id, source, product_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS watch_changes (
+    id INTEGER PRIMARY KEY,
+    watch_id INTEGER NOT NULL,
+    observed_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    product_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    old_price INTEGER,
+    new_price INTEGER,
+    title TEXT,
+    url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_watch_changes_time ON watch_changes (observed_at);
+"""
+
+COLUMNS = ('title', 'price', 'price_num', 'rating', 'category', 'url', 'image')
+
+
+def product_key(product):
+    """Stable identity of a listing: ASIN for Amazon, else the product URL, else the title"""
+    url = product.get('url') or ''
+    match = ASIN.search(url)
+    if match:
+        return match.group(1)
+    if url and not SEARCH_PAGE.search(url):
+        return url.split('?')[0].split('#')[0].rstrip('/')
+    return 'title:' + ' '.join(product['title'].lower().split())
+
+
+class PriceStore:
+    """SQLite (WAL) store of product price observations for history and price-drop queries"""
+
+    def __init__(self, path='data/prices.db'):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.executescript(SCHEMA)
+        if conn.execute("SELECT 1 FROM listings LIMIT 1").fetchone() is None:
+            # Stores from before listings were tracked: the last price change is the best guess
+            with conn:
+                conn.execute("INSERT INTO listings SELECT source, product_key, MAX(observed_at) "
+                             "FROM observations GROUP BY source, product_key")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record_run(self, query, websites, products, observed_at=None):
+        """Store one scrape in a single transaction, keeping only new products and price changes.
+
+        Returns the run id.
+        """
+        observed_at = observed_at or time.time()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (query, websites, created_at, product_count) VALUES (?, ?, ?, ?)",
+                (query, ','.join(websites or []), observed_at, len(products)))
+            run_id = cursor.lastrowid
+            rows = []
+            seen = {}
+            for p in products:
+                key = product_key(p)
+                seen[(p['source'], key)] = observed_at
+                latest = conn.execute(
+                    "SELECT price_num FROM observations WHERE source = ? AND product_key = ? "
+                    "ORDER BY observed_at DESC LIMIT 1", (p['source'], key)).fetchone()
+                if latest is None or latest['price_num'] != p.get('price_num'):
+                    rows.append((p['source'], key, observed_at, run_id, *(p.get(c) for c in COLUMNS)))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO observations (source, product_key, observed_at, run_id, {', '.join(COLUMNS)}) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in COLUMNS)})",
+                rows)
+            conn.executemany(
+                "INSERT INTO listings (source, product_key, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT (source, product_key) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)",
+                [(source, key, at) for (source, key), at in seen.items()])
+        return run_id
+
+    def price_history(self, source, key, since=None):
+        rows = self._conn().execute(
+            "SELECT observed_at, price_num, price, title, url FROM observations "
+            "WHERE source = ? AND product_key = ? AND observed_at >= ? ORDER BY observed_at",
+            (source, key, since or 0))
+        return [dict(row) for row in rows]
+
+    def cheapest_ever(self, source, key):
+        row = self._conn().execute(
+            "SELECT observed_at, price_num, price, title, url FROM observations "
+            "WHERE source = ? AND product_key = ? AND price_num IS NOT NULL "
+            "ORDER BY price_num, observed_at LIMIT 1",
+            (source, key)).fetchone()
+        return dict(row) if row else None
+
+    def price_drops(self, since, min_drop_pct=0, limit=100):
+        """Products whose current price is below their previous different price and dropped since `since`"""
+        rows = self._conn().execute("""
+            WITH current AS (
+                SELECT source, product_key, MAX(observed_at) AS observed_at
+                FROM observations WHERE price_num IS NOT NULL
+                GROUP BY source, product_key
+            ),
+            changes AS (
+                SELECT o.source, o.product_key, o.observed_at, o.price_num, o.title, o.url,
+                       (SELECT p.price_num FROM observations p
+                        WHERE p.source = o.source AND p.product_key = o.product_key
+                          AND p.price_num IS NOT NULL AND p.price_num != o.price_num
+                        ORDER BY p.observed_at DESC LIMIT 1) AS previous_price
+                FROM observations o JOIN current USING (source, product_key, observed_at)
+                -- Only changes are stored, so the current row's time is when the price dropped
+                WHERE o.observed_at >= ?
+            )
+            SELECT source, product_key, observed_at, last_seen, title, url, previous_price, price_num,
+                   ROUND(100.0 * (previous_price - price_num) / previous_price, 1) AS drop_pct
+            FROM changes JOIN listings USING (source, product_key)
+            WHERE previous_price > price_num
+              AND 100.0 * (previous_price - price_num) / previous_price >= ?
+            ORDER BY drop_pct DESC
+            LIMIT ?
+        """, (since, min_drop_pct, limit))
+        return [dict(row) for row in rows]
+
+    def compact(self, retention_days=90):
+        """Drop listings not seen within retention, older price changes, and runs of unchanged prices"""
+        cutoff = time.time() - retention_days * 86400
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM observations WHERE (source, product_key) IN "
+                         "(SELECT source, product_key FROM listings WHERE last_seen < ?)", (cutoff,))
+            conn.execute("DELETE FROM listings WHERE last_seen < ?", (cutoff,))
+            # Only price changes are stored, so a listing still seen may have its latest observation
+            # from before the cutoff; that one is its current price and is kept
+            conn.execute("""
+                DELETE FROM observations WHERE observed_at < ? AND observed_at < (
+                    SELECT MAX(latest.observed_at) FROM observations latest
+                    WHERE latest.source = observations.source AND latest.product_key = observations.product_key
+                )
+            """, (cutoff,))
+            # Keep the first observation of each unchanged price streak plus the latest one
+            conn.execute("""
+                DELETE FROM observations WHERE (source, product_key, observed_at) IN (
+                    SELECT source, product_key, observed_at FROM (
+                        SELECT source, product_key, observed_at, price_num,
+                               LAG(price_num) OVER w AS previous_price,
+                               LEAD(observed_at) OVER w AS next_seen
+                        FROM observations
+                        WINDOW w AS (PARTITION BY source, product_key ORDER BY observed_at)
+                    )
+                    WHERE price_num IS previous_price AND next_seen IS NOT NULL
+                )
+            """)
+            conn.execute("DELETE FROM runs WHERE created_at < ? AND id NOT IN (SELECT run_id FROM observations)",
+                         (cutoff,))
+            conn.execute("DELETE FROM watch_changes WHERE observed_at < ?", (cutoff,))
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def add_watch(self, query, websites=None, interval=900):
+        """Register (or re-interval) a watched query; it is due immediately. Returns the watch id"""
+        now = time.time()
+        sites = ','.join(sorted(set(websites or [])))
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO watches (query, websites, interval, next_run, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (query, websites) DO UPDATE SET interval = excluded.interval",
+                (query, sites, interval, now, now))
+            row = conn.execute("SELECT id FROM watches WHERE query = ? AND websites = ?", (query, sites)).fetchone()
+        return row['id']
+
+    def remove_watch(self, watch_id):
+        conn = self._conn()
+        with conn:
+            deleted = conn.execute("DELETE FROM watches WHERE id = ?", (watch_id,)).rowcount
+            conn.execute("DELETE FROM watch_items WHERE watch_id = ?", (watch_id,))
+        return deleted > 0
+
+    def watches(self):
+        return [self._watch(row) for row in self._conn().execute("SELECT * FROM watches ORDER BY id")]
+
+    def due_watches(self, now=None):
+        rows = self._conn().execute("SELECT * FROM watches WHERE next_run <= ? ORDER BY next_run",
+                                    (now or time.time(),))
+        return [self._watch(row) for row in rows]
+
+    def _watch(self, row):
+        watch = dict(row)
+        watch['websites'] = watch['websites'].split(',') if watch['websites'] else None
+        return watch
+
+    def schedule_watch(self, watch_id, next_run, last_run=None):
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE watches SET next_run = ?, last_run = COALESCE(?, last_run) WHERE id = ?",
+                         (next_run, last_run, watch_id))
+
+    def claim_watch(self, watch_id, now, next_run):
+        """Move a due watch to its next run; False when another scheduler claimed it first"""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("UPDATE watches SET next_run = ? WHERE id = ? AND next_run <= ?",
+                                  (next_run, watch_id, now))
+        return cursor.rowcount == 1
+
+    def apply_watch_results(self, watch_id, products, observed_at=None, scraped=None):
+        """Diff a watch's new result set against its previous one by product URL.
+
+        Stores and returns only the changes: new listings, price moves, listings gone and back.
+        Listings are only marked gone for sources in `scraped` (all when None): a source that was
+        skipped or failed this run says nothing about its listings.
+        """
+        observed_at = observed_at or time.time()
+        conn = self._conn()
+        previous = {(row['source'], row['product_key']): row for row in conn.execute(
+            "SELECT source, product_key, price_num, available FROM watch_items WHERE watch_id = ?", (watch_id,))}
+
+        changes = []
+        current = {}
+        for p in products:
+            key = (p['source'], product_key(p))
+            if key in current:
+                continue
+            current[key] = p
+            old = previous.get(key)
+            price = p.get('price_num')
+            if old is None:
+                kind = 'new'
+            elif not old['available']:
+                kind = 'back'
+            elif old['price_num'] != price:
+                kind = 'price_down' if (price or 0) < (old['price_num'] or 0) else 'price_up'
+            else:
+                continue
+            changes.append({'source': key[0], 'product_key': key[1], 'kind': kind,
+                            'old_price': old['price_num'] if old else None, 'new_price': price,
+                            'title': p.get('title'), 'url': p.get('url')})
+        for key, old in previous.items():
+            if old['available'] and key not in current and (scraped is None or key[0] in scraped):
+                changes.append({'source': key[0], 'product_key': key[1], 'kind': 'unavailable',
+                                'old_price': old['price_num'], 'new_price': None, 'title': None, 'url': None})
+
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO watch_items (watch_id, source, product_key, price_num, available) "
+                "VALUES (?, ?, ?, ?, 1)",
+                [(watch_id, source, key, p.get('price_num')) for (source, key), p in current.items()])
+            conn.executemany(
+                "UPDATE watch_items SET available = 0 WHERE watch_id = ? AND source = ? AND product_key = ?",
+                [(watch_id, c['source'], c['product_key']) for c in changes if c['kind'] == 'unavailable'])
+            conn.executemany(
+                "INSERT INTO watch_changes (watch_id, observed_at, source, product_key, kind, old_price, new_price, "
+                "title, url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(watch_id, observed_at, c['source'], c['product_key'], c['kind'], c['old_price'],
+                  c['new_price'], c['title'], c['url']) for c in changes])
+        return changes
+
+    def watch_changes(self, since, watch_id=None, limit=200):
+        rows = self._conn().execute(
+            "SELECT * FROM watch_changes WHERE observed_at >= ? AND (? IS NULL OR watch_id = ?) "
+            "ORDER BY observed_at DESC, id DESC LIMIT ?", (since, watch_id, watch_id, limit))
+        return [dict(row) for row in rows]
+
+    def runs(self, query=None, limit=50):
+        rows = self._conn().execute(
+            "SELECT * FROM runs WHERE (? IS NULL OR query = ? COLLATE NOCASE) ORDER BY created_at DESC LIMIT ?",
+            (query, query, limit))
+        return [dict(row) for row in rows]
+
+    def latest_products(self, limit=20000):
+        """The most recent observation of each product, most recently seen first"""
+        rows = self._conn().execute(
+            f"SELECT o.source, l.last_seen AS observed_at, {', '.join('o.' + c for c in COLUMNS)} "
+            "FROM listings l JOIN observations o ON o.source = l.source AND o.product_key = l.product_key "
+            "AND o.observed_at = (SELECT MAX(observed_at) FROM observations "
+            "WHERE source = l.source AND product_key = l.product_key) "
+            "ORDER BY l.last_seen DESC LIMIT ?", (limit,))
+        return [dict(row) for row in rows]
+
+    def iter_observations(self, run_id=None, query=None, since=None, until=None, batch_size=1000):
+        """Stream stored observations (new products and price changes) oldest first, batch_size rows at a time"""
+        cursor = self._conn().execute(
+            f"SELECT o.observed_at, o.run_id, r.query, o.source, o.product_key, {', '.join('o.' + c for c in COLUMNS)} "
+            "FROM observations o JOIN runs r ON r.id = o.run_id "
+            "WHERE (? IS NULL OR o.run_id = ?) AND (? IS NULL OR r.query = ? COLLATE NOCASE) "
+            "AND o.observed_at >= ? AND o.observed_at <= ? ORDER BY o.observed_at",
+            (run_id, run_id, query, query, since or 0, until or time.time()))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+
+    def start_maintenance(self, interval=6 * 3600, retention_days=90):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.compact(retention_days)
+                except sqlite3.Error as e:
+                    print(f"Price store compaction error: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,77 @@
+"""HTTP fast path parsing against saved pages; no network.
+
+Run from backend/:  python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import BLOCK_MARKERS, parse_rows
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_amazon_rows():
+    rows = parse_rows('amazon', fixture('amazon.html'), 'https://www.amazon.in/s?k=iphone+15')
+
+    assert len(rows) == 3
+    first, second, sponsored = rows
+    assert first['asin'] == 'B0CHX1W1XY'
+    assert first['title'] == 'Apple iPhone 15 (128 GB) - Black'
+    assert first['price'] == '69,900'
+    assert first['mrp'] == '₹79,900'
+    assert first['rating'] == '4.5 out of 5 stars'
+    assert first['image'].startswith('https://m.media-amazon.com/')
+    # Fallback selectors: no link in the heading, price only in the offscreen span
+    assert second['title'] == 'Apple iPhone 15 (256 GB) - Blue'
+    assert second['price'] == '₹79,900'
+    assert second['mrp'] is None and second['rating'] is None
+    # An empty data-asin fails the pattern, so the row is dropped later for missing a required field
+    assert sponsored['asin'] is None
+
+
+def test_flipkart_rows():
+    rows = parse_rows('flipkart', fixture('flipkart.html'), 'https://www.flipkart.com/search?q=iphone+15')
+
+    assert [row['title'] for row in rows] == ['Apple iPhone 15 (Black, 128 GB)', 'Apple iPhone 15 (Green, 256 GB)']
+    first, second = rows
+    assert first['price'] == '₹65,999'
+    assert first['mrp'] == '₹79,900'
+    assert first['rating'] == '4.6'
+    # Relative hrefs resolve against the page URL, as DOM properties do in the browser
+    assert first['url'] == ('https://www.flipkart.com/apple-iphone-15-black-128-gb/p/itm6ac6485515ae4'
+                            '?pid=MOBGTAGPTB3VS24W')
+    assert second['price'] == '₹75,999'
+    assert second['rating'] is None
+
+
+def test_json_ld_fallback():
+    rows = parse_rows('croma', fixture('croma_json_ld.html'), 'https://www.croma.com/searchB?q=iphone+15')
+
+    assert rows == [
+        {'title': 'Apple iPhone 15 (128GB, Black)', 'price': '₹69900', 'rating': '4.4',
+         'url': 'https://www.croma.com/apple-iphone-15-128gb-black/p/300652',
+         'image': 'https://media-ik.croma.com/prod/300652.png'},
+        {'title': 'Apple iPhone 15 Plus (256GB, Blue)', 'price': '₹89900', 'rating': None,
+         'url': 'https://www.croma.com/apple-iphone-15-plus-256gb-blue/p/300660', 'image': None},
+    ]
+
+
+def test_limit():
+    rows = parse_rows('croma', fixture('croma_json_ld.html'), 'https://www.croma.com/', limit=1)
+    assert len(rows) == 1
+
+
+def test_page_without_listing():
+    assert parse_rows('flipkart', '<html><body><p>No results found</p></body></html>', 'https://www.flipkart.com/') == []
+
+
+def test_block_markers():
+    assert BLOCK_MARKERS.search('<title>Robot Check</title> Enter the characters you see below')
+    assert not BLOCK_MARKERS.search(fixture('amazon.html'))
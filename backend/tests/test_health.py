@@ -0,0 +1,29 @@
+"""Circuit breaker bookkeeping for SiteHealth.
+
+Run from backend/:  python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from health import CLOSED, OPEN, SiteHealth
+
+
+def test_empty_is_neutral():
+    health = SiteHealth(threshold=3)
+    health.record('amazon', 'blocked')
+    health.record('amazon', 'blocked')
+    # A no-results page must not wipe out the streak of bot walls before it
+    health.record('amazon', 'empty')
+    assert health.snapshot()['amazon']['failures'] == 2
+    health.record('amazon', 'blocked')
+    assert health.snapshot()['amazon']['state'] == OPEN
+
+
+def test_success_resets():
+    health = SiteHealth(threshold=2)
+    health.record('croma', 'timeout')
+    health.record('croma')
+    health.record('croma', 'timeout')
+    assert health.snapshot()['croma']['state'] == CLOSED
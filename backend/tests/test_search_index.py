@@ -0,0 +1,25 @@
+"""ProductIndex behaviour that needs no stored data.
+
+Run from backend/:  python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product import Product
+from search_index import ProductIndex
+
+
+def row(n):
+    return {'title': f'Smart TV {n}', 'price': f'₹{n}', 'price_num': n, 'source': 'Croma',
+            'url': f'https://www.croma.com/tv-{n}/p/{n}', 'rating': None, 'observed_at': n}
+
+
+def test_seeded_products_evict_oldest_first():
+    index = ProductIndex(max_products=3)
+    # latest_products() order: most recently seen first
+    index.seed([row(30), row(20), row(10)])
+    index.add([Product('Smart TV new', '₹5', 5, 'Croma', 'https://www.croma.com/tv-new/p/1')], seen=40)
+
+    assert sorted(p.title for p in index.search('smart tv')) == ['Smart TV 20', 'Smart TV 30', 'Smart TV new']
@@ -0,0 +1,22 @@
+"""Learned selector order from SelectorStats; nothing is saved to disk.
+
+Run from backend/:  python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selector_stats import SelectorStats
+from sites import SITES
+
+
+def test_generic_tail_keeps_its_place():
+    stats = SelectorStats(min_attempts=5)
+    selectors = SITES['croma'].fields['price']['selectors']
+    # span.new-price hits most often, the catch-all span[class*='price'] next
+    stats.record('croma', 'price', selectors, {4: 30, 6: 10})
+
+    planned = stats.plan(SITES['croma'])[4]['price']['selectors']
+    assert planned[0] == 'span.new-price'
+    assert planned[5:] == selectors[5:]
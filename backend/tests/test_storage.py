@@ -0,0 +1,55 @@
+"""PriceStore queries against a temporary database.
+
+Run from backend/:  python -m pytest tests
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product import Product
+from storage import PriceStore
+
+DAY = 86400
+
+
+def tv(price):
+    return Product('Samsung Crystal 4K TV', f'₹{price}', price, 'Croma', 'https://www.croma.com/samsung-tv/p/1')
+
+
+def test_price_drop_after_a_long_steady_price(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.db'))
+    now = time.time()
+    store.record_run('tv', None, [tv(1000)], observed_at=now - 30 * DAY)
+    store.record_run('tv', None, [tv(1000)], observed_at=now - 2 * DAY)
+    store.record_run('tv', None, [tv(800)], observed_at=now - 3600)
+
+    drops = store.price_drops(now - DAY)
+    assert [(d['previous_price'], d['price_num'], d['drop_pct']) for d in drops] == [(1000, 800, 20.0)]
+
+
+def test_old_price_drop_is_outside_the_window(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.db'))
+    now = time.time()
+    store.record_run('tv', None, [tv(1000)], observed_at=now - 10 * DAY)
+    store.record_run('tv', None, [tv(800)], observed_at=now - 5 * DAY)
+    store.record_run('tv', None, [tv(800)], observed_at=now - 3600)
+
+    assert store.price_drops(now - DAY) == []
+    assert len(store.price_drops(now - 7 * DAY)) == 1
+
+
+def test_compact_keeps_listings_still_seen_and_drops_vanished_ones(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.db'))
+    now = time.time()
+    gone = Product('Old TV', '₹500', 500, 'Croma', 'https://www.croma.com/old-tv/p/2')
+    store.record_run('tv', None, [tv(1000), gone], observed_at=now - 200 * DAY)
+    # Same price today: no new observation, but the listing was seen
+    store.record_run('tv', None, [tv(1000)], observed_at=now - 3600)
+
+    store.compact(retention_days=90)
+
+    assert [(p['title'], p['price_num']) for p in store.latest_products()] == [('Samsung Crystal 4K TV', 1000)]
+    assert store.cheapest_ever('Croma', 'https://www.croma.com/samsung-tv/p/1')['price_num'] == 1000
+    assert store.price_history('Croma', 'https://www.croma.com/old-tv/p/2') == []
@@ -0,0 +1,100 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from jobs import PRIORITY_REFRESH, QueueFullError
+from sites import SITES
+
+
+class WatchScheduler:
+    """Re-scrapes watched queries in the background so their results stay warm in the cache.
+
+    Due watches are submitted as refresh-priority jobs, at most `capacity` at a time, and each
+    finished result set is diffed against the previous one so only changes are kept.
+    """
+
+    def __init__(self, store, jobs, make_key, capacity=2, jitter=0.1, tick=5,
+                 default_interval=900, popular_threshold=0, max_searches=2000):
+        self.store = store
+        self.jobs = jobs
+        self.make_key = make_key
+        self.capacity = capacity
+        # Fraction of the interval each run is shifted by, so watches added together drift apart
+        self.jitter = jitter
+        self.tick = tick
+        self.default_interval = default_interval
+        # Auto-watch a query after this many searches (0 disables)
+        self.popular_threshold = popular_threshold
+        # Distinct queries counted towards popularity; the rarest are dropped past this
+        self.max_searches = max_searches
+        self._inflight = {}
+        self._searches = Counter()
+        self._lock = threading.Lock()
+
+    def start(self):
+        thread = threading.Thread(target=self._loop, name='watch-scheduler', daemon=True)
+        thread.start()
+        return thread
+
+    def add(self, query, websites=None, interval=None):
+        return self.store.add_watch(query, websites, interval or self.default_interval)
+
+    def note_search(self, query, websites=None):
+        """Count a user search; popular queries become watches"""
+        if not self.popular_threshold:
+            return
+        key = self.make_key(query, websites)
+        with self._lock:
+            self._searches[key] += 1
+            popular = self._searches[key] == self.popular_threshold
+            if len(self._searches) > self.max_searches * 1.25:
+                self._searches = Counter(dict(self._searches.most_common(self.max_searches)))
+        if popular:
+            watch_id = self.add(query, websites)
+            print(f"👀 Watching popular query '{query}' (watch {watch_id})")
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Watch scheduler error: {e}")
+            time.sleep(self.tick)
+
+    def run_once(self, now=None):
+        now = now or time.time()
+        self._collect()
+
+        for watch in self.store.due_watches(now):
+            if len(self._inflight) >= self.capacity:
+                break
+            if watch['id'] in self._inflight:
+                continue
+            interval = watch['interval'] * random.uniform(1 - self.jitter, 1 + self.jitter)
+            # Every web process may run a scheduler; only the one that claims the watch scrapes it
+            if not self.store.claim_watch(watch['id'], now, now + interval):
+                continue
+            cache_key = self.make_key(watch['query'], watch['websites'])
+            try:
+                job, _ = self.jobs.submit(watch['query'], watch['websites'], cache_key, priority=PRIORITY_REFRESH)
+            except QueueFullError:
+                self.store.schedule_watch(watch['id'], watch['next_run'])
+                break
+            self._inflight[watch['id']] = job
+            self.store.schedule_watch(watch['id'], now + interval, last_run=now)
+
+    def _collect(self):
+        for watch_id, job in list(self._inflight.items()):
+            if not job.is_finished:
+                continue
+            del self._inflight[watch_id]
+            if job.state != 'done':
+                continue
+            # Only sources that scraped cleanly can tell us a listing is gone
+            scraped = {SITES[site].name for site, status in (job.site_status or {}).items()
+                       if status == 'ok' and site in SITES}
+            changes = self.store.apply_watch_results(watch_id, job.results or [], job.finished_at, scraped)
+            if changes:
+                kinds = Counter(change['kind'] for change in changes)
+                print(f"👀 '{job.query}': " + ', '.join(f"{n} {kind}" for kind, n in sorted(kinds.items())))
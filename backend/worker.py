@@ -0,0 +1,112 @@
+"""Scrape worker processes for SCRAPE_MODE=process.
+
+Runs SCRAPE_PROCESSES worker processes, each with its own browser pool, that take jobs
+from the shared job queue and write results back to it. The parent process restarts
+workers that die and schedules watchlist refreshes:
+    SCRAPE_MODE=process python app.py      # web tier, no browsers
+    python worker.py                       # scrape tier
+
+Each worker reports its circuit breakers, browser pool and metric totals to the queue
+database, for the web tier's /api/site-health and /api/metrics.
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from cache import make_key
+from jobqueue import JobQueue, QueuedJobManager, work
+from metrics import REGISTRY
+from selector_stats import SelectorStats
+from storage import PriceStore
+from watchlist import WatchScheduler
+
+JOB_DB = os.environ.get('JOB_DB', 'data/jobs.db')
+PRICE_DB = os.environ.get('PRICE_DB', 'data/prices.db')
+# Seconds between worker snapshots for /api/site-health and /api/metrics on the web tier
+REPORT_INTERVAL = int(os.environ.get('WORKER_REPORT_INTERVAL', 15))
+
+
+def report(queue, runner, name, interval):
+    """Share this process's breakers, browser pool and metric totals through the job queue"""
+    while True:
+        try:
+            queue.report_worker(name, {'site_health': runner.health.snapshot(),
+                                       'driver_pool': runner.driver_pool.stats(),
+                                       'metrics': REGISTRY.totals()})
+        except Exception as e:
+            print(f"⚠️ Could not report worker stats: {e}")
+        time.sleep(interval)
+
+
+def run_worker(index):
+    # Browsers, fetcher and stores are per process; nothing is inherited from the parent
+    from runner import ScrapeRunner
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    # The supervisor stops workers with SIGTERM, which would otherwise kill the process without
+    # unwinding, leaving its browsers running
+    signal.signal(signal.SIGTERM, stop)
+
+    selector_stats = SelectorStats(os.environ.get('SELECTOR_STATS', 'data/selector_stats.json'))
+    runner = ScrapeRunner(PriceStore(PRICE_DB), selector_stats)
+    queue = JobQueue(JOB_DB)
+    name = f'{socket.gethostname()}-{index}-{os.getpid()}'
+    threading.Thread(target=report, args=(queue, runner, name, REPORT_INTERVAL), daemon=True).start()
+    try:
+        work(queue, runner.run_job, name, stale_after=int(os.environ.get('WORKER_STALE_AFTER', 120)))
+    finally:
+        # Quit the browsers before interpreter exit waits on any scrape threads still running
+        runner.shutdown()
+
+
+def start_worker(index):
+    process = multiprocessing.Process(target=run_worker, args=(index,), name=f'scrape-worker-{index}')
+    process.start()
+    return process
+
+
+def supervise(count):
+    os.makedirs('data', exist_ok=True)
+    queue = JobQueue(JOB_DB)
+    price_store = PriceStore(PRICE_DB)
+    price_store.start_maintenance(retention_days=int(os.environ.get('PRICE_RETENTION_DAYS', 90)))
+
+    watch_scheduler = WatchScheduler(
+        price_store,
+        QueuedJobManager(queue, max_queue=int(os.environ.get('SCRAPE_QUEUE_SIZE', 20))),
+        make_key,
+        # Leave the remaining workers free for interactive searches
+        capacity=max(1, count - 1),
+        default_interval=int(os.environ.get('WATCH_INTERVAL', 900)),
+        popular_threshold=int(os.environ.get('WATCH_POPULAR_AFTER', 3))
+    )
+    watch_scheduler.start()
+
+    processes = [start_worker(i) for i in range(count)]
+    print(f"🚀 Started {count} scrape worker processes")
+    try:
+        while True:
+            time.sleep(5)
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"⚠️ Scrape worker {i} exited ({process.exitcode}), restarting")
+                    processes[i] = start_worker(i)
+            queue.prune()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=30)
+
+
+if __name__ == '__main__':
+    # Chrome and its driver threads do not survive fork
+    multiprocessing.set_start_method('spawn')
+    supervise(int(os.environ.get('SCRAPE_PROCESSES', 2)))
@@ -16,36 +16,42 @@ function App() {
   const [selectedCategory, setSelectedCategory] = useState('all');
   const [sortBy, setSortBy] = useState('price_low');
   const [isLoading, setIsLoading] = useState(false);
+  const [jobId, setJobId] = useState(null);
   const [loadingMessage, setLoadingMessage] = useState('');
   const [showSearchModal, setShowSearchModal] = useState(true);
   const [selectedWebsites, setSelectedWebsites] = useState(['flipkart', 'amazon', 'vijay_sales', 'jiomart', 'croma']);
+  const [deepSearch, setDeepSearch] = useState(false);
 
-  // Poll for scraping status
+  // Stream the current job: products render as each site finishes
   useEffect(() => {
-    let interval;
-    if (isLoading) {
-      interval = setInterval(async () => {
-        try {
-          const response = await axios.get('/api/status');
-          const status = response.data;
-          
-          setLoadingMessage(status.message);
-          
-          if (!status.is_running && status.progress === 100) {
-            // Scraping complete, fetch results
-            const resultsResponse = await axios.get('/api/results');
-            setProducts(resultsResponse.data);
-            setFilteredProducts(resultsResponse.data);
-            setIsLoading(false);
-            clearInterval(interval);
-          }
-        } catch (error) {
-          console.error('Error checking status:', error);
-        }
-      }, 2000);
-    }
-    return () => clearInterval(interval);
-  }, [isLoading]);
+    if (!isLoading || !jobId) return undefined;
+
+    const source = new EventSource(`/api/stream/${jobId}`);
+
+    source.addEventListener('progress', (e) => {
+      setLoadingMessage(JSON.parse(e.data).message);
+    });
+
+    source.addEventListener('site', (e) => {
+      const { products: siteProducts } = JSON.parse(e.data);
+      setProducts(prev => [...prev, ...siteProducts]);
+    });
+
+    source.addEventListener('done', () => {
+      setIsLoading(false);
+      source.close();
+    });
+
+    source.addEventListener('error', (e) => {
+      if (e.data) {
+        setIsLoading(false);
+        source.close();
+        alert(JSON.parse(e.data).message);
+      }
+    });
+
+    return () => source.close();
+  }, [isLoading, jobId]);
 
   // Filter and sort products
   useEffect(() => {
@@ -70,11 +76,7 @@ function App() {
     } else if (sortBy === 'price_high') {
       filtered.sort((a, b) => (b.price_num || 0) - (a.price_num || 0));
     } else if (sortBy === 'rating') {
-      filtered.sort((a, b) => {
-        const ratingA = parseFloat(a.rating) || 0;
-        const ratingB = parseFloat(b.rating) || 0;
-        return ratingB - ratingA;
-      });
+      filtered.sort((a, b) => (b.rating || 0) - (a.rating || 0));
     }
 
     setFilteredProducts(filtered);
@@ -86,30 +88,32 @@ function App() {
       return;
     }
 
+    setProducts([]);
     setIsLoading(true);
     setShowSearchModal(false);
     setLoadingMessage('Starting search...');
 
     try {
-      await axios.post('/api/search', {
+      const response = await axios.post('/api/search', {
         query: newSearch,
-        websites: selectedWebsites.length === 5 ? null : selectedWebsites
+        websites: selectedWebsites.length === 5 ? null : selectedWebsites,
+        deep: deepSearch
       });
+      setJobId(response.data.job_id);
     } catch (error) {
       console.error('Search error:', error);
       setIsLoading(false);
-      alert('Error starting search. Please try again.');
+      if (error.response && error.response.status === 429) {
+        alert('The server is busy with other searches. Please try again in a few seconds.');
+      } else {
+        alert('Error starting search. Please try again.');
+      }
     }
   };
 
-  const handleExport = async () => {
-    try {
-      const response = await axios.get('/api/export');
-      alert(`Results exported: ${response.data.filename}`);
-    } catch (error) {
-      console.error('Export error:', error);
-      alert('Error exporting results');
-    }
+  const handleExport = () => {
+    // The server streams the file as a download
+    window.location.href = jobId ? `/api/export?format=csv&job_id=${jobId}` : '/api/export?format=csv';
   };
 
   const toggleWebsite = (website) => {
@@ -180,6 +184,15 @@ function App() {
                 ))}
               </div>
 
+              <label className="deep-search-option">
+                <input
+                  type="checkbox"
+                  checked={deepSearch}
+                  onChange={(e) => setDeepSearch(e.target.checked)}
+                />
+                <span>Deep search (more pages, slower)</span>
+              </label>
+
               <button onClick={handleSearch} className="search-btn">
                 <Search className="w-5 h-5" />
                 <span>Start Comparison</span>
@@ -190,7 +203,7 @@ function App() {
       )}
 
       {/* Loading Overlay */}
-      {isLoading && (
+      {isLoading && products.length === 0 && (
         <div className="loading-overlay">
           <div className="loading-content">
             <Loader className="loading-spinner" />
@@ -260,6 +273,16 @@ function App() {
         </div>
       </div>
 
+      {/* Streaming progress once the first site has reported */}
+      {isLoading && products.length > 0 && (
+        <div className="container">
+          <div className="streaming-status">
+            <Loader className="streaming-spinner" />
+            <span>{loadingMessage}</span>
+          </div>
+        </div>
+      )}
+
       {/* Best Deal */}
       {bestDeal && (
         <div className="container">
@@ -383,14 +406,14 @@ function App() {
           {filteredProducts.map((product, idx) => (
             <div key={idx} className="product-card">
               <div className="product-image">
-                <img src={product.image !== 'N/A' ? product.image : 'https://via.placeholder.com/400x400?text=No+Image'} alt={product.title} />
+                <img src={product.image || 'https://via.placeholder.com/400x400?text=No+Image'} alt={product.title} />
                 <div className={`source-badge ${getSourceColor(product.source)}`}>
                   {product.source}
                 </div>
-                {product.offers !== 'N/A' && (
+                {product.discount_pct > 0 && (
                   <div className="offer-badge">
                     <Tag className="w-3 h-3" />
-                    <span>OFFERS</span>
+                    <span>{product.discount_pct}% OFF</span>
                   </div>
                 )}
               </div>
@@ -403,15 +426,15 @@ function App() {
                     <div className="product-price">{product.price}</div>
                     <div className="product-category">{product.category}</div>
                   </div>
-                  {product.rating !== 'N/A' && (
+                  {product.rating != null && (
                     <div className="product-rating">
                       <Star className="w-4 h-4 fill-current" />
-                      <span>{product.rating.split(' ')[0]}</span>
+                      <span>{product.rating}</span>
                     </div>
                   )}
                 </div>
 
-                {product.offers !== 'N/A' && (
+                {product.offers && (
                   <div className="product-offers">
                     <Tag className="w-4 h-4" />
                     <p>{product.offers}</p>